@@ -1,60 +1,161 @@
-from ast import literal_eval
-from datetime import datetime
+import assets # Fingerprinted static assets
+import auth_utils # Password hashing off the request thread
+import cart_utils # Shopping cart queries
+import catalog # In-process catalog (items) cache
+import click
+import db_profiler # Query profiler and slow-query log
 import db_utils # SQLite3: Connect on demand
-from flask import Flask, flash, g, jsonify, redirect, render_template, request, session, url_for
-from flask_session import Session
-from helpers import admin_login_required, allowed_file, login_required, usd
+import export_utils # Streaming CSV/NDJSON exports
+from flask import (Flask, Response, abort, flash, jsonify, redirect, render_template, request,
+    session, stream_with_context, url_for)
+from flask.cli import AppGroup
+from helpers import (MAX_PRICE_CENTS, admin_login_required, allowed_file, dollars, login_required,
+    page_args, timestamp, to_cents, usd)
+import fragments # Rendered item cards cache
+import http_cache # Conditional GET for catalog pages
+import images # Background image pipeline
 import logging
+import order_utils # Order queries
 import os
+import search_utils # Item search queries
+import session_utils # Session backends
+import sqlite3
 from werkzeug.exceptions import RequestEntityTooLarge
-from werkzeug.security import check_password_hash, generate_password_hash
 from werkzeug.utils import secure_filename
 
 # Initialize Flask application
 app = Flask(__name__)
 
-# Configure application (e.g., store session on disk)
+# Configure application (e.g., store sessions in the database)
 app.config["SESSION_PERMANENT"] = False
-app.config["SESSION_TYPE"] = "filesystem"
+app.config["SESSION_BACKEND"] = "sqlite" # "filesystem", "sqlite" or "cookie" (see session_utils.py)
+app.config["SESSION_TYPE"] = "filesystem" # Flask-Session, for the "filesystem" backend
+app.config["SESSION_SWEEP_INTERVAL"] = 600 # seconds between sweeps of expired sessions (0: off)
+app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY") # Needed by the "cookie" backend
 app.config["TEMPLATES_AUTO_RELOAD"] = True
 app.config["UPLOAD_FOLDER"] = "static/images"
 app.config["MAX_CONTENT_LENGTH"] = 4 * (1024 * 1024) # 4 MB limit
-Session(app)
+app.config["IMAGE_WORKERS"] = 2 # Threads producing resized item images
+app.config["IMAGE_SWEEP_INTERVAL"] = 3600 # seconds between sweeps of unused images (0: off)
+app.config["IMAGE_SWEEP_GRACE"] = 3600 # seconds before an unused image may be swept
 
-# Custom filter
+# Custom filters
+app.jinja_env.filters["dollars"] = dollars
+app.jinja_env.filters["timestamp"] = timestamp
 app.jinja_env.filters["usd"] = usd
 
+# Custom globals
+app.jinja_env.globals["asset_url"] = assets.asset_url
+app.jinja_env.globals["image_url"] = images.image_url
+
 # Set up the database
-app.config["DATABASE"] = "store.db"
-app.config["DEBUG_DB"] = True
+app.config["DATABASE"] = os.environ.get("DATABASE", "store.db")
+app.config["DEBUG_DB"] = os.environ.get("DEBUG_DB") == "1" # Log every query
+
+# Schema migrations (migrations/) run once per deploy with `flask db upgrade`;
+# with DB_AUTO_MIGRATE on (e.g., in development) workers apply them on startup
+app.config["DB_AUTO_MIGRATE"] = os.environ.get("DB_AUTO_MIGRATE") == "1"
+
+# Query profiler, shown on /admin/metrics (see db_profiler.py)
+app.config["DB_PROFILE"] = os.environ.get("DB_PROFILE") == "1"
+app.config["DB_SLOW_QUERY_MS"] = 100.0 # Log (and explain) queries slower than this
+
+# Connection pools (see db_utils.DEFAULT_PRAGMAS for the per-connection PRAGMAs):
+# SELECTs use read-only connections, held per request; writes check one of a
+# few writer connections out per statement or transaction
+app.config["DB_READ_ONLY_CONNECTIONS"] = os.environ.get("DB_READ_ONLY_CONNECTIONS", "1") == "1"
+app.config["DB_POOL_SIZE"] = 8 # Readers
+app.config["DB_WRITER_POOL_SIZE"] = 2
+app.config["DB_POOL_TIMEOUT"] = 10.0 # seconds
+
+# How often a worker checks whether its cached catalog is still current
+app.config["CATALOG_CHECK_INTERVAL"] = 1.0 # seconds
+
+# How many rendered item cards each worker keeps (least recently used are dropped)
+app.config["FRAGMENT_CACHE_SIZE"] = 2048
+
+# Search results each worker keeps, and for how long
+app.config["SEARCH_CACHE_SIZE"] = 512
+app.config["SEARCH_CACHE_TTL"] = 60.0 # seconds
+
+# Page sizes (can be changed per request with ?limit=, up to the max)
+app.config["ITEMS_PER_PAGE"] = 24
+app.config["SEARCH_RESULTS_LIMIT"] = 15
+app.config["MAX_PAGE_SIZE"] = 100
+app.config["ORDERS_PER_PAGE"] = 50
+
+# Rows read (and encoded) at a time by the /admin/export/* streams
+app.config["EXPORT_CHUNK_SIZE"] = 1000
+
+# Maximum quantity of one item in a cart
+app.config["CART_MAX_QTY"] = 99
+
+# Password hashing (see auth_utils.py): method and cost of new hashes (older
+# hashes are replaced on login), worker processes, and how many hashes may be
+# pending before logins are turned away with a 503
+app.config["AUTH_HASH_METHOD"] = "scrypt" # werkzeug's format, e.g. "scrypt:65536:8:1" or "pbkdf2:sha256:600000"
+app.config["AUTH_HASH_WORKERS"] = 2
+app.config["AUTH_HASH_MAX_PENDING"] = 16
+app.config["AUTH_HASH_TIMEOUT"] = 10.0 # seconds
+
+# Maximum size of a checkout request (the cart itself is read server-side)
+app.config["CHECKOUT_MAX_BODY"] = 1024 # bytes
 
 # Configure logging
 if app.config["DEBUG_DB"]:
     app.logger.setLevel(logging.DEBUG)
 
-# Initialize the database
+# Check the database schema version
 db_utils.init_db(app)
 
+# Profile queries (if DB_PROFILE is on)
+db_profiler.init_app(app)
+
+# Hash passwords in worker processes
+auth_utils.init_app(app)
+
+# Set up the session backend
+session_utils.init_app(app)
+
+# Start the image pipeline
+images.init_app(app)
+
+# Serve fingerprinted static files
+assets.init_app(app)
+
+# ETags of catalog pages (depends on the assets)
+http_cache.init_app(app)
+
 # A list of statuses an order can have
 STATUSES = ["cancelled", "delivered", "pending", "sent"]
 
 @app.after_request
 def after_request(response):
-    """Ensure responses aren't cached."""
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-    response.headers["Expires"] = 0
-    response.headers["Pragma"] = "no-cache"
+    """
+    Ensure pages of logged-in users and admins aren't cached.
+    (Static files and catalog pages set their own caching, see assets.py
+    and http_cache.py.)
+    """
+    if "Cache-Control" in response.headers:
+        return response
+
+    if session.get("user_id") or session.get("admin_id"):
+        if response.mimetype == "text/html":
+            response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+            response.headers["Expires"] = 0
+            response.headers["Pragma"] = "no-cache"
+        else:
+            # Private data (e.g., the JSON APIs): never in shared caches, always revalidated
+            response.headers["Cache-Control"] = "private, no-cache"
     return response
 
 
 @app.teardown_appcontext
 def close_connection(exception):
     """
-    Close database connection after every request.
+    Return the request's reader connection to the pool after every request.
     """
-    db = getattr(g, "_database", None)
-    if db is not None:
-        db.close()
+    db_utils.release_db(exception)
 
 # --- Error handlers ---
 
@@ -63,6 +164,11 @@ def not_found(e):
     return render_template("status/error/404.html")
 
 
+@app.errorhandler(auth_utils.HashingBusy)
+def handle_hashing_busy(e):
+    return render_template("status/error/503.html"), 503, {"Retry-After": "2"}
+
+
 @app.errorhandler(RequestEntityTooLarge)
 def handle_large_file(e):
     flash("File too large. Max size is 4 MB.", "error")
@@ -73,31 +179,105 @@ def handle_large_file(e):
 
 @app.route("/api/search")
 @login_required
+@http_cache.conditional_on_catalog
 def api_search():
-    """Search for an item by title."""
+    """Search for an item by title and description."""
 
     q = request.args.get("q")
+    after, _, limit = page_args(request.args, app.config["SEARCH_RESULTS_LIMIT"],
+        app.config["MAX_PAGE_SIZE"])
+    items = search_utils.search(q, after, limit)
+
+    # Return list of items (with their image URL) in JSON format,
+    # with a link to the next page (if any)
+    response = jsonify([dict(item, image=images.image_url(item, "card")) for item in items])
+    if len(items) == limit:
+        next_url = url_for("api_search", q=q, after=items[-1]["id"], limit=limit)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return response
+
+@app.route("/search")
+@login_required
+@http_cache.conditional_on_catalog
+def search():
+    """
+    Search for an item by title and description; returns the item cards
+    (HTML, from the fragment cache) for search.js to insert into the page.
+    """
+
+    q = request.args.get("q")
+    after, _, limit = page_args(request.args, app.config["SEARCH_RESULTS_LIMIT"],
+        app.config["MAX_PAGE_SIZE"])
+    items = search_utils.search(q, after, limit)
+
+    response = app.make_response(str(fragments.render_cards("user/item-card.html", items)))
+    if len(items) == limit:
+        next_url = url_for("search", q=q, after=items[-1]["id"], limit=limit)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return response
+
+@app.route("/api/cart", methods=["GET", "POST", "PATCH", "DELETE"])
+@login_required
+def api_cart():
+    """
+    JSON cart API.
+    GET lists the cart; POST adds `qty` of item `id`; PATCH sets the quantity
+    of item `id` to `qty`; DELETE removes item `id`. Changes only return the
+    changed line (`null` if it was removed) and the new total.
+    """
+
+    user_id = session["user_id"]
+
+    if request.method == "GET":
+        lines = cart_utils.get_summary(user_id)
+        return jsonify(lines=lines, total_cents=cart_utils.get_total(user_id))
+
+    # Accept a JSON body (an object) as well as form data
+    data = request.get_json(silent=True) or request.form
+    if not isinstance(data, dict):
+        return jsonify(error="Expected a JSON object or form data."), 400
 
-    if q:
-        items = db_utils.execute("SELECT * FROM items WHERE title LIKE ? LIMIT 15",
-            ("%" + q + "%",))
+    # Validate id (and qty, at least 1)
+    try:
+        id = int(data.get("id"))
+        qty = int(data.get("qty")) if request.method != "DELETE" else None
+    except (TypeError, ValueError):
+        return jsonify(error="Invalid value(s)."), 400
+
+    if qty is not None and qty < 1:
+        return jsonify(error="Quantity must be at least 1."), 400
+
+    if request.method == "POST":
+        cart_utils.add(user_id, id, qty)
+    elif request.method == "PATCH":
+        if not cart_utils.set_quantity(user_id, id, qty):
+            return jsonify(error="No such item in cart."), 404
     else:
-        items = []
+        cart_utils.remove(user_id, id)
 
-    # Return list of items in JSON format
-    return jsonify(items)
+    line = cart_utils.get_line(user_id, id)
+    if line is None and request.method != "DELETE":
+        return jsonify(error="No such item."), 404
+
+    return jsonify(id=id, line=line, total_cents=cart_utils.get_total(user_id))
 
 # --- User ---
 
 @app.route("/")
 @login_required
+@http_cache.conditional_on_catalog
 def index():
     """Show all items."""
 
-    # Query database for items
-    rows = db_utils.execute("SELECT * FROM items")
+    # Get a page of items from the catalog cache
+    after, before, limit = page_args(request.args, app.config["ITEMS_PER_PAGE"],
+        app.config["MAX_PAGE_SIZE"])
+    page = catalog.get_page(after, before, limit)
 
-    return render_template("user/index.html", items=rows)
+    # Item cards come from the fragment cache
+    cards = fragments.render_cards("user/item-card.html", page.items)
+    return render_template("user/index.html", cards=cards, page=page,
+        catalog_version=catalog.version())
 
 
 @app.route("/cart", methods=["GET", "POST"])
@@ -110,38 +290,25 @@ def cart():
 
         """Add item to cart."""
 
-        # Validate id and qty
+        # Validate id and qty (at least 1)
         try:
             id = int(request.form.get("id"))
             qty = int(request.form.get("qty"))
-            print(id, qty)
-        except ValueError:
+        except (TypeError, ValueError):
             flash("Invalid value(s).", "error")
             return redirect(url_for("cart"))
-        
-        if id and qty:
-            rows = db_utils.execute("SELECT * from cart WHERE item_id = ? AND user_id = ?",
-                (id, session["user_id"]))
-            
-            if len(rows) > 0:
-                current_qty = int(rows[0]["quantity"])
 
-                db_utils.execute("UPDATE cart SET quantity = ? WHERE item_id = ? AND user_id = ?",
-                    (current_qty + qty, id, session["user_id"]))
-                
-            else:
-                db_utils.execute("INSERT INTO cart (quantity, item_id, user_id) VALUES (?, ?, ?)",
-                    (qty, id, session["user_id"]))
+        if qty < 1:
+            flash("Quantity must be at least 1.", "error")
+            return redirect(url_for("cart"))
+
+        if id:
+            cart_utils.add(session["user_id"], id, qty)
     
     """Select items from cart."""
 
-    cart = db_utils.execute(
-        "SELECT * FROM cart JOIN items ON items.id = cart.item_id WHERE cart.user_id = ?",
-        (session["user_id"],))
-    
-    total = 0.00
-    for item in cart:
-        total += int(item["price"]) * int(item["quantity"])
+    cart = cart_utils.get_lines(session["user_id"])
+    total = cart_utils.get_total(session["user_id"])
     
     # Render cart.html to the user, passing in cart and total
     return render_template("user/cart.html", cart=cart, total=total)
@@ -152,23 +319,15 @@ def cart():
 def checkout():
     """Check user out."""
 
-    items = request.form.get("cart")
+    # The cart is read server-side, so the request carries no data worth parsing;
+    # reject large bodies before anything reads them
+    if (request.content_length or 0) > app.config["CHECKOUT_MAX_BODY"]:
+        flash("Invalid checkout request.", "error")
+        return redirect(url_for("cart"))
 
-    if items:
+    # Turn the cart into an order (snapshotting unit prices) and empty it in one transaction
+    if order_utils.place(session["user_id"]):
         flash("Thank you for your purchase.", "info")
-        items = literal_eval(items)
-
-        for item in items:
-            db_utils.execute(
-                "INSERT INTO orders (user_id, item_id, quantity, date) VALUES (?, ?, ?, ?)",
-                (
-                    session["user_id"],
-                    item["item_id"],
-                    item["quantity"],
-                    datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                ),
-            )
-        db_utils.execute("DELETE FROM cart where user_id = ?", (session["user_id"],))
 
     return redirect(url_for("orders"))
 
@@ -185,20 +344,22 @@ def delete():
         return redirect(url_for("cart"))
     
     if id:
-        db_utils.execute("DELETE FROM cart WHERE item_id = ? AND user_id = ?",
-            (id, session["user_id"]))
+        cart_utils.remove(session["user_id"], id)
     
     return redirect(url_for("cart"))
 
 
 @app.route("/item/<int:id>")
 @login_required
+@http_cache.conditional_on_catalog
 def item(id):
     """Show an individual item."""
 
-    rows = db_utils.execute("SELECT * FROM items WHERE id = ?", (id,))
+    item = catalog.get_item(id)
+    if item is None:
+        abort(404)
     
-    return render_template("user/item.html", item=rows[0])
+    return render_template("user/item.html", item=item)
 
 
 @app.route("/orders")
@@ -206,13 +367,17 @@ def item(id):
 def orders():
     """Show orders to the user."""
 
-    rows = db_utils.execute("""
-        SELECT * FROM orders
-        JOIN items on items.id = orders.item_id
-        WHERE orders.user_id = ?""",
-        (session["user_id"],))
+    after, _, limit = page_args(request.args, app.config["ORDERS_PER_PAGE"],
+        app.config["MAX_PAGE_SIZE"])
+
+    orders = order_utils.get_user_orders(session["user_id"], after, limit)
+    lines = order_utils.get_lines([order["id"] for order in orders])
+
+    # Id of the last order shown, if there may be older ones
+    next_cursor = orders[-1]["id"] if len(orders) == limit else None
     
-    return render_template("user/orders.html", orders=rows)
+    return render_template("user/orders.html", orders=orders, lines=lines,
+        next_cursor=next_cursor, limit=limit)
 
 
 @app.route("/update-qty", methods=["POST"])
@@ -220,18 +385,21 @@ def orders():
 def update_qty():
     """Update an item's quantity."""
 
-    # Validate item id and quantity
+    # Validate item id and quantity (at least 1)
     try:
         id = int(request.form.get("id"))
         qty = int(request.form.get("qty"))
-    except ValueError:
+    except (TypeError, ValueError):
         flash("Invalid value(s)", "error")
         return redirect(url_for("cart"))
-    
-    if id and qty:
-        db_utils.execute("UPDATE cart SET quantity = ? WHERE item_id = ? AND user_id = ?",
-            (qty, id, session["user_id"]))
-        
+
+    if qty < 1:
+        flash("Quantity must be at least 1.", "error")
+        return redirect(url_for("cart"))
+
+    if id and not cart_utils.set_quantity(session["user_id"], id, qty):
+        flash("No such item in cart.", "error")
+
     return redirect(url_for("cart"))
 
 # --- User: Auth ---
@@ -256,7 +424,7 @@ def change_password():
         # Ensure current password is correct
         rows = db_utils.execute("SELECT hash FROM users WHERE id = ?",
             (session["user_id"],))
-        if not check_password_hash(rows[0]["hash"], current):
+        if not auth_utils.check_password(rows[0]["hash"], current):
             flash("Current password is incorrect.", "error")
             return redirect(url_for("change_password"))
         
@@ -277,7 +445,7 @@ def change_password():
         
         # Update old hash with new
         db_utils.execute("UPDATE users SET hash = ? WHERE id = ?",
-            (generate_password_hash(new), session["user_id"],))
+            (auth_utils.hash_password(new), session["user_id"],))
         
         flash("Password changed successfully.", "info")
         return redirect(url_for("change_password"))
@@ -313,7 +481,7 @@ def login():
         rows = db_utils.execute("SELECT * FROM users WHERE username = ?", (username,))
 
         # Ensure username exists in database and password is correct
-        if len(rows) != 1 or not check_password_hash(rows[0]["hash"], password):
+        if len(rows) != 1 or not auth_utils.verify("users", rows[0], password):
             flash("Invalid username and/or password.", "error")
             return redirect(url_for("login"))
         
@@ -378,7 +546,7 @@ def register():
         
         # Insert the new user into users table, storing a hash of the password
         db_utils.execute("INSERT INTO users (username, hash) VALUES (?, ?)",
-            (username, generate_password_hash(password)))
+            (username, auth_utils.hash_password(password)))
         
         # Redirect to login page
         flash("Successfully registered. Please log in.")
@@ -400,14 +568,103 @@ def admin():
 def admin_orders():
     """Display orders to admin (i.e., show admin panel)."""
 
-    orders = {}
-
+    # Orders are listed newest first, per status; `?status=<status>&after=<order id>`
+    # shows the next (older) page of one status
+    paged_status = request.args.get("status")
+    after, _, limit = page_args(request.args, app.config["ORDERS_PER_PAGE"],
+        app.config["MAX_PAGE_SIZE"])
+
+    # Orders per status, kept up to date by triggers (migrations/0005_order_status_counts.sql)
+    counts = dict.fromkeys(STATUSES, 0)
+    for row in db_utils.execute("SELECT status, n FROM order_status_counts"):
+        counts[row["status"]] = row["n"]
+
+    # Fetch a page (+1 row, to know if there is a next one) of every status
+    # in one query; each branch is a range scan of order_headers_status_created
+    queries = []
+    args = []
     for status in STATUSES:
-        orders[status] = db_utils.execute(
-            "SELECT * FROM orders WHERE orders.status = ?", (status,)
-        )
+        if status == paged_status and after is not None:
+            queries.append("""
+                SELECT * FROM (
+                    SELECT * FROM order_headers WHERE status = ?
+                    AND (created_at, id) < ((SELECT created_at FROM order_headers WHERE id = ?), ?)
+                    ORDER BY created_at DESC, id DESC LIMIT ?
+                )""")
+            args.extend((status, after, after, limit + 1))
+        else:
+            queries.append("""
+                SELECT * FROM (
+                    SELECT * FROM order_headers WHERE status = ?
+                    ORDER BY created_at DESC, id DESC LIMIT ?
+                )""")
+            args.extend((status, limit + 1))
+
+    orders = {status: [] for status in STATUSES}
+    for row in db_utils.execute(" UNION ALL ".join(queries), args):
+        orders[row["status"]].append(row)
+
+    # Id of the last order shown per status, if there are older ones
+    next_cursors = {}
+    for status in STATUSES:
+        if len(orders[status]) > limit:
+            orders[status] = orders[status][:limit]
+            next_cursors[status] = orders[status][-1]["id"]
+
+    lines = order_utils.get_lines([order["id"] for status in STATUSES for order in orders[status]])
 
-    return render_template("admin/orders.html", orders=orders, statuses=STATUSES)
+    return render_template("admin/orders.html", orders=orders, lines=lines, statuses=STATUSES,
+        counts=counts, next_cursors=next_cursors, limit=limit)
+
+
+def export_response(name: str, rows, columns: list):
+    """
+    Stream an export as a download, in the format of `?format=` (csv by
+    default). The body is sent chunked while rows are read, in constant memory.
+    """
+    format = request.args.get("format", "csv")
+    if format not in export_utils.FORMATS:
+        abort(400, f"Unknown format, expected one of: {', '.join(export_utils.FORMATS)}")
+
+    chunks = export_utils.encode(rows, format, columns, app.config["EXPORT_CHUNK_SIZE"])
+    response = Response(stream_with_context(chunks), mimetype=export_utils.FORMATS[format])
+    response.headers["Content-Disposition"] = f'attachment; filename="{name}.{format}"'
+    # Don't let a reverse proxy (e.g., nginx) buffer the whole export
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@app.route("/admin/export/orders")
+@admin_login_required
+def admin_export_orders():
+    """
+    Export order lines (with their order) as CSV or NDJSON, oldest first.
+    Filters: `?status=<status>&from=<YYYY-MM-DD>&to=<YYYY-MM-DD>` (dates inclusive).
+    """
+
+    status = request.args.get("status")
+    if status and status not in STATUSES:
+        abort(400, f"Unknown status, expected one of: {', '.join(STATUSES)}")
+
+    try:
+        start = request.args.get("from")
+        start = start and export_utils.parse_date(start, "from")
+        end = request.args.get("to")
+        end = end and export_utils.parse_date(end, "to")
+    except ValueError as e:
+        abort(400, str(e))
+
+    rows = export_utils.order_rows(status, start, end, app.config["EXPORT_CHUNK_SIZE"])
+    return export_response("orders", rows, export_utils.ORDER_COLUMNS)
+
+
+@app.route("/admin/export/items")
+@admin_login_required
+def admin_export_items():
+    """Export the catalog (items) as CSV or NDJSON."""
+
+    rows = export_utils.item_rows(app.config["EXPORT_CHUNK_SIZE"])
+    return export_response("items", rows, export_utils.ITEM_COLUMNS)
 
 
 @app.route("/admin/delete-item", methods=["POST"])
@@ -418,12 +675,11 @@ def admin_delete_item():
     id = request.form.get("id")
 
     if id:
-        rows = db_utils.execute("SELECT filename FROM items WHERE id = ?",
-            (id,))
         db_utils.execute("DELETE FROM items WHERE id = ?", (id,))
+        catalog.invalidate()
 
-        # Remove image from disk
-        os.remove(os.path.join(app.config["UPLOAD_FOLDER"], rows[0]["filename"]))
+        # The image is removed from disk by the sweeper, once no item uses it
+        images.request_sweep()
 
         flash(f"Successfully deleted an item of id: {id}", "info")
 
@@ -443,23 +699,31 @@ def admin_edit_item(id):
         description = request.form.get("description")
 
         try:
-            price = float(price)
+            price = to_cents(price)
         except ValueError:
-            flash("Price must be a real number.", "error")
+            flash(f"Price must be a number between 0 and {usd(MAX_PRICE_CENTS)} "
+                "with at most two decimal places.", "error")
             return redirect(url_for("admin_edit_item", id=id))
 
-        if title and price and description:
+        # A price of 0 is valid (to_cents rejects missing prices)
+        if title and price is not None and description:
             db_utils.execute("""
-                UPDATE items SET title = ?, price = ?, description = ? WHERE id = ?
+                UPDATE items SET title = ?, price_cents = ?, description = ? WHERE id = ?
                 """, (title, price, description, id))
-        
+            catalog.invalidate()
+        else:
+            flash("Missing title, price or description.", "error")
+            return redirect(url_for("admin_edit_item", id=id))
+
         flash(f"Successfully updated an item of id: {id}", "info")
         return redirect(url_for("admin_items"))
 
     else:
         
-        rows = db_utils.execute("SELECT * FROM items WHERE id = ?", (id,))
-        return render_template("admin/edit-item.html", item=rows[0])
+        item = catalog.get_item(id)
+        if item is None:
+            abort(404)
+        return render_template("admin/edit-item.html", item=item)
 
 
 @app.route("/admin/items")
@@ -467,9 +731,38 @@ def admin_edit_item(id):
 def admin_items():
     """Display a list of items in database."""
 
-    items = db_utils.execute("SELECT * FROM items")
+    after, before, limit = page_args(request.args, app.config["ITEMS_PER_PAGE"],
+        app.config["MAX_PAGE_SIZE"])
+    page = catalog.get_page(after, before, limit)
+
+    # Item cards come from the fragment cache
+    cards = fragments.render_cards("admin/item-card.html", page.items)
+    return render_template("admin/items.html", cards=cards, page=page)
+
+
+@app.route("/admin/metrics")
+@admin_login_required
+def admin_metrics():
+    """Show this worker's query profile and cache statistics (`?format=json` for JSON)."""
+
+    profiler = db_profiler.get_profiler(app)
+    fragment_cache = fragments.get_cache()
+    search_cache = search_utils.get_cache()
 
-    return render_template("admin/items.html", items=items)
+    metrics = {
+        "profile": profiler.report() if profiler else None,
+        "pools": db_utils.pool_stats(),
+        "caches": {
+            "fragments": {"size": len(fragment_cache), "hits": fragment_cache.hits,
+                "misses": fragment_cache.misses},
+            "search": {"size": len(search_cache), "hits": search_cache.hits,
+                "misses": search_cache.misses},
+        },
+    }
+
+    if request.args.get("format") == "json":
+        return jsonify(metrics)
+    return render_template("admin/metrics.html", metrics=metrics)
 
 
 @app.route("/admin/new-item", methods=["GET", "POST"])
@@ -484,12 +777,14 @@ def admin_new_item():
         description = request.form.get("description")
 
         try:
-            price = float(price)
+            price = to_cents(price)
         except ValueError:
-            flash("Price must be a real number.", "error")
+            flash(f"Price must be a number between 0 and {usd(MAX_PRICE_CENTS)} "
+                "with at most two decimal places.", "error")
             return redirect(url_for("admin_new_item"))
 
-        if title and price and description:
+        # A price of 0 is valid (to_cents rejects missing prices)
+        if title and price is not None and description:
 
             # Check if the POST request has a file part
             if 'file' not in request.files:
@@ -508,21 +803,26 @@ def admin_new_item():
                 filename = secure_filename(file.filename)
                 _, extension = os.path.splitext(filename)
 
-                current_top_id = db_utils.execute("SELECT MAX(id) as n FROM items")
-                new_id = int(current_top_id[0]["n"]) + 1 if current_top_id[0]["n"] else 1
-                
-                new_name = str(new_id) + extension
-
-                image_path = os.path.join(app.config["UPLOAD_FOLDER"], new_name)
-                file.save(image_path)
-
-                db_utils.execute(
-                    """
-                    INSERT INTO items (title, filename, price, description)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                    (title, new_name, price, description)
-                )
+                # Store the image durably under a content-addressed name first;
+                # if the insert fails, the unused file is removed by the sweeper
+                new_name = images.save_original(file, extension)
+
+                # The database allocates the id
+                try:
+                    new_id = db_utils.execute(
+                        """
+                        INSERT INTO items (title, filename, price_cents, description)
+                        VALUES (?, ?, ?, ?)
+                        """,
+                        (title, new_name, price, description)
+                    )
+                except sqlite3.IntegrityError:
+                    flash("An item with this title already exists.", "error")
+                    return redirect(url_for("admin_new_item"))
+                catalog.invalidate()
+
+                # Resize the image in the background
+                images.submit(new_id, new_name)
                 
                 flash(f"Successfully added a new item of id: {new_id}")
                 return redirect(url_for("admin_items"))
@@ -546,8 +846,7 @@ def admin_update_status():
     status = request.form.get("status")
 
     if status and status in STATUSES and order_id:
-        db_utils.execute("UPDATE orders SET status = ? WHERE id = ?",
-            (status, order_id))
+        order_utils.set_status(order_id, status)
     
     return redirect(url_for("admin_orders"))
 
@@ -578,7 +877,7 @@ def admin_login():
         rows = db_utils.execute("SELECT * FROM admins WHERE username = ?", (username,))
 
         # Ensure username exists in database and password is correct
-        if len(rows) != 1 or not check_password_hash(rows[0]["hash"], password):
+        if len(rows) != 1 or not auth_utils.verify("admins", rows[0], password):
             flash("Invalid username and/or password.", "error")
             return redirect(url_for("admin_login"))
         
@@ -644,7 +943,7 @@ def admin_register():
         
         # Insert the new user into admins table, storing a hash of the password
         db_utils.execute("INSERT INTO admins (username, hash) VALUES (?, ?)",
-            (username, generate_password_hash(password)))
+            (username, auth_utils.hash_password(password)))
         
         # Flash a message and redirect to login page
         flash("Successfully registered. Please log in.", "info")
@@ -653,3 +952,65 @@ def admin_register():
     # User reached route via GET (by clicking on a link, typing in a URL, via redirect)
     else:
         return render_template("admin/auth/register.html")
+
+# --- CLI ---
+
+@app.cli.command("resize-images")
+@click.option("--all", "all_items", is_flag=True, help="Also redo items that already have variants.")
+def resize_images(all_items):
+    """Produce resized variants of item images (e.g., for items added before the pipeline)."""
+
+    if all_items:
+        rows = db_utils.execute("SELECT id, filename FROM items")
+    else:
+        rows = db_utils.execute("SELECT id, filename FROM items WHERE image_hash IS NULL")
+
+    futures = [images.submit(row["id"], row["filename"]) for row in rows]
+    failed = 0
+    for future in futures:
+        if future is None:
+            raise click.ClickException("Pillow is not installed.")
+        if future.exception():
+            failed += 1
+
+    click.echo(f"Resized images of {len(futures) - failed} item(s), {failed} failed.")
+
+
+@app.cli.command("sweep-images")
+@click.option("--grace", default=None, type=float,
+    help="Keep unused files younger than this many seconds (default: IMAGE_SWEEP_GRACE).")
+def sweep_images(grace):
+    """Remove item images (and their variants) that no item uses anymore."""
+
+    removed = images.sweep(app, grace)
+    click.echo(f"Removed {len(removed)} unused image file(s).")
+
+
+# --- CLI: Database ---
+
+db_cli = AppGroup("db", help="Manage the database schema.")
+
+
+@db_cli.command("upgrade")
+def db_upgrade():
+    """Apply pending schema migrations (once per deploy, before starting workers)."""
+
+    applied = db_utils.upgrade_db(app)
+    with app.app_context():
+        version = db_utils.schema_version(db_utils.get_db())
+
+    if applied:
+        click.echo(f"Applied {len(applied)} migration(s), schema is at version {version}.")
+    else:
+        click.echo(f"Schema is up to date (version {version}).")
+
+
+@db_cli.command("version")
+def db_version():
+    """Show the schema version of the database."""
+
+    with app.app_context():
+        click.echo(db_utils.schema_version(db_utils.get_db()))
+
+
+app.cli.add_command(db_cli)
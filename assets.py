@@ -0,0 +1,101 @@
+# Fingerprinted static assets
+
+# At startup every file in the static folder gets a fingerprinted name with a
+# hash of its content (e.g., styles.css -> styles.3f2a1b9c.css). Templates link
+# to that name through `asset_url`, so a changed file gets a new URL and
+# fingerprinted responses can be cached by browsers for a year.
+from flask import current_app, url_for
+import hashlib
+import os
+import re
+import threading
+
+# Length of the (hex) content hash in fingerprinted names
+FINGERPRINT_LENGTH = 8
+
+# How long browsers may cache fingerprinted (i.e., immutable) files
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60 # 1 year
+
+# Uploaded images are named after their content already (see images.py)
+CONTENT_ADDRESSED = re.compile(r"(^|/)[0-9a-f]{16}(-\w+)?\.\w+$")
+
+
+class Manifest:
+    """
+    Maps static files (paths relative to the static folder) to their
+    fingerprinted names, and back.
+    """
+
+    def __init__(self, static_folder: str):
+        self.static_folder = static_folder
+        self._lock = threading.Lock()
+        self.fingerprinted = {}
+        self.logical = {}
+
+    def build(self):
+        """Fingerprint every file currently in the static folder."""
+        for root, _, files in os.walk(self.static_folder):
+            for name in files:
+                path = os.path.relpath(os.path.join(root, name), self.static_folder)
+                self.add(path.replace(os.sep, "/"))
+
+    def add(self, filename: str):
+        """
+        Fingerprint one file. Returns its fingerprinted name, or `None` if there
+        is no such file.
+        """
+        if CONTENT_ADDRESSED.search(filename):
+            # The name is a fingerprint already
+            fingerprinted = filename
+        else:
+            digest = hashlib.sha256()
+            try:
+                with open(os.path.join(self.static_folder, filename), "rb") as f:
+                    while chunk := f.read(64 * 1024):
+                        digest.update(chunk)
+            except (FileNotFoundError, IsADirectoryError):
+                return None
+            digest = digest.hexdigest()
+
+            root, extension = os.path.splitext(filename)
+            fingerprinted = f"{root}.{digest[:FINGERPRINT_LENGTH]}{extension}"
+
+        with self._lock:
+            self.fingerprinted[filename] = fingerprinted
+            self.logical[fingerprinted] = filename
+        return fingerprinted
+
+
+def init_app(app):
+    """
+    Build the asset manifest of an application and serve fingerprinted static
+    files (with long-lived caching) from the `static` endpoint.
+    """
+    manifest = app.extensions["assets"] = Manifest(app.static_folder)
+    manifest.build()
+
+    def static(filename):
+        """Serve a static file; fingerprinted names are cached for a year."""
+        logical = manifest.logical.get(filename)
+
+        if logical is None:
+            return app.send_static_file(filename)
+
+        response = app.send_static_file(logical)
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions["static"] = static
+
+
+def asset_url(filename: str) -> str:
+    """
+    Return the URL of a static file under its fingerprinted name (files added
+    after startup, e.g. uploads, are fingerprinted on first use).
+    """
+    manifest = current_app.extensions["assets"]
+    fingerprinted = manifest.fingerprinted.get(filename) or manifest.add(filename)
+    return url_for("static", filename=fingerprinted or filename)
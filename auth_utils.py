@@ -0,0 +1,159 @@
+# Password hashing off the request thread
+
+# Hashing a password on purpose costs tens to hundreds of milliseconds of CPU.
+# Done inline, a burst of logins ties up the worker's threads and CPU and
+# starves storefront requests, so hashes are computed by a small pool of
+# processes instead.
+# At most AUTH_HASH_MAX_PENDING hashes may be queued or running per worker;
+# beyond that requests are rejected right away (`HashingBusy`, a 503) instead
+# of piling up. Hashes made with older parameters than AUTH_HASH_METHOD are
+# replaced on the next successful login, so the cost can be tuned centrally.
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from multiprocessing import get_context
+from werkzeug.security import check_password_hash, generate_password_hash
+import db_utils
+import threading
+
+# Tables whose rows have a password `hash` column
+TABLES = ("users", "admins")
+
+
+class HashingBusy(Exception):
+    """Raised when too many hashes are pending (or one took too long)."""
+
+
+class Hasher:
+    """
+    Hashes and checks passwords in a process pool of `workers` processes
+    (inline if 0), with at most `max_pending` hashes in flight.
+    """
+
+    def __init__(self, method: str = "scrypt", workers: int = 2, max_pending: int = 16,
+                 timeout: float = 10.0):
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+
+        # The parameters (e.g., "scrypt:32768:8:1") hashes made now start with
+        self.parameters = generate_password_hash("", method).split("$", 1)[0]
+
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Started on first use; "spawn", as forking a process with threads isn't safe
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=get_context("spawn"))
+            return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        # A worker process died (e.g., killed): the pool is unusable, start a new one
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _release_slot(self, future):
+        self._slots.release()
+
+    def _run(self, fn, *args):
+        if self.workers == 0:
+            return fn(*args)
+
+        # Tried again once, on a new pool, if the pool broke
+        for attempt in range(2):
+            executor = self._get_executor()
+
+            if not self._slots.acquire(blocking=False):
+                raise HashingBusy()
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                self._slots.release()
+                self._discard_executor(executor)
+                continue
+            except BaseException:
+                self._slots.release()
+                raise
+
+            # The slot is only freed once the job is done, even if we stop waiting for it
+            future.add_done_callback(self._release_slot)
+
+            try:
+                return future.result(self.timeout)
+            except TimeoutError:
+                # Drop it if it hasn't started yet; a running job keeps its slot
+                future.cancel()
+                raise HashingBusy()
+            except BrokenProcessPool:
+                self._discard_executor(executor)
+
+        raise HashingBusy()
+
+    def hash(self, password: str) -> str:
+        """Return a hash of a password, made with the current parameters."""
+        return self._run(generate_password_hash, password, self.method)
+
+    def check(self, pwhash: str, password: str) -> bool:
+        """Check a password against a hash."""
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        """Check whether a hash was made with other parameters than the current ones."""
+        return pwhash.split("$", 1)[0] != self.parameters
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+def init_app(app):
+    """Set up the password hasher of an application."""
+    app.extensions["auth"] = Hasher(
+        app.config.get("AUTH_HASH_METHOD", "scrypt"),
+        app.config.get("AUTH_HASH_WORKERS", 2),
+        app.config.get("AUTH_HASH_MAX_PENDING", 16),
+        app.config.get("AUTH_HASH_TIMEOUT", 10.0),
+    )
+
+
+def hash_password(password: str) -> str:
+    """Return a hash of a password (computed off the request thread)."""
+    return current_app.extensions["auth"].hash(password)
+
+
+def check_password(pwhash: str, password: str) -> bool:
+    """Check a password against a hash (computed off the request thread)."""
+    return current_app.extensions["auth"].check(pwhash, password)
+
+
+def verify(table: str, row, password: str) -> bool:
+    """
+    Check the password of a user or admin (a row of `table`, "users" or
+    "admins"). On success, replace a hash made with outdated parameters.
+    """
+    if table not in TABLES:
+        raise ValueError(f"Unknown table {table!r}")
+
+    hasher = current_app.extensions["auth"]
+    if not hasher.check(row["hash"], password):
+        return False
+
+    if hasher.needs_rehash(row["hash"]):
+        try:
+            new_hash = hasher.hash(password)
+        except HashingBusy:
+            # Not worth failing the login for: try again next time
+            return True
+
+        # Only if the hash didn't change meanwhile (e.g., a password change)
+        db_utils.execute(f"UPDATE {table} SET hash = ? WHERE id = ? AND hash = ?",
+            (new_hash, row["id"], row["hash"]))
+
+    return True
@@ -0,0 +1,57 @@
+# Compare two benchmark results (JSON files written by benchmarks.run)
+
+# Prints the change of every benchmark's p50 (median) and exits with status 1
+# if any p50 got slower by more than --threshold percent.
+#
+# Usage: python -m benchmarks.compare BASELINE CURRENT [--threshold PERCENT]
+import argparse
+import json
+import sys
+
+SECTIONS = ("routes", "micro")
+
+
+def compare(baseline: dict, current: dict, threshold: float = 10.0) -> list:
+    """
+    Return (section, name, baseline p50, current p50, change in %, regressed)
+    for every benchmark present in both results.
+    """
+    rows = []
+    for section in SECTIONS:
+        for name, before in baseline.get(section, {}).items():
+            after = current.get(section, {}).get(name)
+            if after is None or not before["p50_us"]:
+                continue
+
+            change = (after["p50_us"] - before["p50_us"]) / before["p50_us"] * 100
+            rows.append((section, name, before["p50_us"], after["p50_us"], change,
+                change > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark results")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0,
+        help="p50 slowdown (in %%) that counts as a regression")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    rows = compare(baseline, current, args.threshold)
+
+    print(f"{'benchmark':<36}{'p50 before':>12}{'p50 after':>12}{'change':>10}")
+    for section, name, before, after, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{section + '/' + name:<36}{before:>12}{after:>12}{change:>+9.1f}%{flag}")
+
+    if any(row[-1] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# Micro-benchmarks of the query layer and template rendering
+
+# Each one times a single building block (on a seeded database, see run.py),
+# so a regression can be told apart from noise in the route benchmarks.
+from benchmarks.timing import time_calls
+from flask import render_template
+import catalog
+import db_utils
+import fragments
+import random
+
+
+def run(app, ids: dict, calls: int = 1000, rng_seed: int = 42) -> dict:
+    """Run every micro-benchmark; returns {name: {n, mean_us, p50_us, ...}}."""
+    rng = random.Random(rng_seed)
+    warmup = max(1, calls // 10)
+    results = {}
+
+    with app.test_request_context("/"):
+
+        # db_utils.execute: a point lookup, and a 100-row page per row type
+        results["execute_point"] = time_calls(
+            lambda: db_utils.execute("SELECT * FROM items WHERE id = ?",
+                (rng.randint(1, ids["items"]),)),
+            calls, warmup)
+
+        for row_type in (db_utils.ROW_DICT, db_utils.ROW_ROW, db_utils.ROW_TUPLE):
+            results[f"execute_100_rows_{row_type}"] = time_calls(
+                lambda: db_utils.execute("SELECT * FROM items WHERE id > ? ORDER BY id LIMIT 100",
+                    (rng.randint(0, ids["items"] - 100),), row_type=row_type),
+                calls, warmup)
+
+        # Turning 1000 rows into dicts: per row (dict_factory) or in bulk (fetch_rows)
+        db = db_utils.get_db()
+
+        def per_row():
+            cur = db.cursor()
+            cur.row_factory = db_utils.dict_factory
+            cur.execute("SELECT * FROM items LIMIT 1000").fetchall()
+            cur.close()
+
+        def bulk():
+            cur = db.cursor()
+            cur.row_factory = None
+            cur.execute("SELECT * FROM items LIMIT 1000")
+            db_utils.fetch_rows(cur)
+            cur.close()
+
+        results["dict_factory_1000_rows"] = time_calls(per_row, calls // 10, warmup)
+        results["fetch_rows_1000_rows"] = time_calls(bulk, calls // 10, warmup)
+
+        # Template rendering: the index page with cold and with cached item cards
+        page = catalog.get_page(limit=app.config["ITEMS_PER_PAGE"])
+        cache = fragments.get_cache()
+
+        def render_index():
+            cards = fragments.render_cards("user/item-card.html", page.items)
+            render_template("user/index.html", cards=cards, page=page, catalog_version=0)
+
+        results["render_index_cold"] = time_calls(render_index, calls // 10, warmup,
+            setup=cache.clear)
+        results["render_index_cached"] = time_calls(render_index, calls, warmup)
+
+    return results
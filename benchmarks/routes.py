@@ -0,0 +1,61 @@
+# Load benchmark of the shop's hot routes
+
+# Drives the real app (on a seeded database, see run.py) through Flask's test
+# client: no network or WSGI server, so the numbers are the app's own cost
+# (routing, queries, rendering, sessions) per request.
+from benchmarks import seed as seed_data
+from benchmarks.timing import time_calls
+import random
+
+
+def login(client, user_id=None, admin_id=None):
+    with client.session_transaction() as session:
+        if user_id is not None:
+            session["user_id"] = user_id
+        if admin_id is not None:
+            session["admin_id"] = admin_id
+
+
+def run(app, ids: dict, requests: int = 200, rng_seed: int = 42) -> dict:
+    """
+    Benchmark every route on seeded data (`ids` as returned by seed.seed);
+    returns {route: {n, mean_us, p50_us, p95_us, p99_us, per_second}}.
+    """
+    rng = random.Random(rng_seed)
+    warmup = max(1, requests // 10)
+    results = {}
+
+    # Storefront: pages of the catalog, as a user with a cart
+    client = app.test_client()
+    login(client, user_id=1)
+
+    def index():
+        after = rng.choice((None, rng.randrange(1, ids["items"])))
+        client.get("/" if after is None else f"/?after={after}")
+
+    results["index"] = time_calls(index, requests, warmup)
+
+    # Live search: prefixes of catalog words (repeated, like real typing)
+    def api_search():
+        word = rng.choice(seed_data.WORDS)
+        client.get(f"/api/search?q={word[:rng.randint(2, len(word))]}")
+
+    results["api_search"] = time_calls(api_search, requests, warmup)
+
+    results["cart"] = time_calls(lambda: client.get("/cart"), requests, warmup)
+
+    # Checkout: refill the cart (untimed), then place the order
+    def fill_cart():
+        for item_id in rng.sample(range(1, ids["items"] + 1), 3):
+            client.post("/api/cart", json={"id": item_id, "qty": 1})
+
+    results["checkout"] = time_calls(lambda: client.post("/checkout"), requests, warmup,
+        setup=fill_cart)
+
+    # Admin: the orders page (every status, first page)
+    admin = app.test_client()
+    login(admin, admin_id=ids["admin_id"])
+    results["admin_orders"] = time_calls(lambda: admin.get("/admin/orders"), requests, warmup)
+
+    return results
+
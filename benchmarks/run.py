@@ -0,0 +1,70 @@
+# Benchmark suite: seeded data, route load test and micro-benchmarks
+
+# Writes one JSON document per run; compare two of them (e.g., of the previous
+# and the next release) with `python -m benchmarks.compare`.
+#
+# Usage: python -m benchmarks.run [--requests N] [--users N] [--items M]
+#        [--orders K] [--carts N] [--seed S] [--output FILE]
+from benchmarks import micro, routes
+from benchmarks import seed as seed_data
+import argparse
+import db_utils
+import json
+import os
+import platform
+import sqlite3
+import tempfile
+import time
+
+
+def load_app(database: str):
+    """Import the app on a given database (the app reads DATABASE at import)."""
+    os.environ["DATABASE"] = database
+    os.environ["DB_AUTO_MIGRATE"] = "1"
+    from app import app
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--calls", type=int, default=1000, help="calls per micro-benchmark")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--carts", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="shop-bench-") as folder:
+        database = os.path.join(folder, "store.db")
+
+        # Create the schema (the app migrates its database on load), then the data
+        app = load_app(database)
+        ids = seed_data.seed(database, args.users, args.items, args.orders, args.carts,
+            rng_seed=args.seed)
+
+        results = {
+            "meta": {
+                "time": int(time.time()),
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "platform": platform.platform(),
+                "args": vars(args),
+            },
+            "routes": routes.run(app, ids, args.requests, args.seed),
+            "micro": micro.run(app, ids, args.calls, args.seed),
+        }
+
+        db_utils.close_pools(app)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# Deterministic benchmark data
+
+# Fills an (empty, migrated: `flask db upgrade`) shop database with N users, M items, K historical
+# orders and some carts. The same arguments always produce the same rows, so
+# results of different releases are comparable.
+#
+# Usage: python -m benchmarks.seed DATABASE [--users N] [--items M] [--orders K]
+import argparse
+import random
+import sqlite3
+from werkzeug.security import generate_password_hash
+
+# Every benchmark user and admin has this password
+PASSWORD = "benchmark"
+
+# Words for item titles and descriptions (and search queries)
+WORDS = (
+    "apple", "bamboo", "canvas", "copper", "cotton", "denim", "ebony", "felt",
+    "glass", "granite", "hemp", "iron", "jade", "leather", "linen", "maple",
+    "marble", "nickel", "oak", "onyx", "pewter", "quartz", "rattan", "silk",
+    "slate", "steel", "teak", "tin", "velvet", "walnut", "wool", "zinc",
+)
+NOUNS = (
+    "bag", "bowl", "chair", "clock", "cup", "desk", "jar", "lamp", "mirror",
+    "mug", "pen", "plate", "rug", "shelf", "stool", "table", "tray", "vase",
+)
+STATUSES = ("cancelled", "delivered", "pending", "sent")
+
+# Orders are spread over the year before this (fixed) time
+NOW = 1_700_000_000
+
+
+def seed(database: str, users: int = 1000, items: int = 2000, orders: int = 20000,
+         carts: int = 200, lines_per_order: int = 3, rng_seed: int = 42) -> dict:
+    """
+    Fill `database` with deterministic benchmark data. Returns the ids used by
+    the benchmarks: users (the first `carts` of them have a cart) and the admin.
+    """
+    rng = random.Random(rng_seed)
+    password_hash = generate_password_hash(PASSWORD)
+
+    db = sqlite3.connect(database)
+    with db:
+        db.executemany("INSERT INTO users (id, username, hash) VALUES (?, ?, ?)",
+            ((id, f"user{id}", password_hash) for id in range(1, users + 1)))
+        db.execute("INSERT INTO admins (id, username, hash) VALUES (1, 'admin', ?)",
+            (password_hash,))
+
+        catalog = []
+        for id in range(1, items + 1):
+            words = rng.sample(WORDS, 2)
+            title = f"{words[0].title()} {words[1]} {rng.choice(NOUNS)} #{id}"
+            description = " ".join(rng.choice(WORDS) for _ in range(12))
+            price_cents = rng.randrange(100, 50000)
+            catalog.append((id, title, price_cents))
+            db.execute("""
+                INSERT INTO items (id, title, filename, price_cents, description)
+                VALUES (?, ?, '404.jpg', ?, ?)""",
+                (id, title, price_cents, description))
+
+        line_id = 0
+        for order_id in range(1, orders + 1):
+            lines = rng.sample(catalog, lines_per_order)
+            quantities = [rng.randint(1, 5) for _ in lines]
+            total = sum(price * qty for (_, _, price), qty in zip(lines, quantities))
+
+            db.execute("""
+                INSERT INTO order_headers (id, user_id, created_at, status, total_cents)
+                VALUES (?, ?, ?, ?, ?)""",
+                (order_id, rng.randint(1, users), NOW - rng.randrange(365 * 24 * 3600),
+                 rng.choice(STATUSES), total))
+
+            for (item_id, title, price), qty in zip(lines, quantities):
+                line_id += 1
+                db.execute("""
+                    INSERT INTO order_lines (id, order_id, item_id, title, quantity, unit_price_cents)
+                    VALUES (?, ?, ?, ?, ?, ?)""",
+                    (line_id, order_id, item_id, title, qty, price))
+
+        for user_id in range(1, carts + 1):
+            for item_id, _, _ in rng.sample(catalog, rng.randint(1, 5)):
+                db.execute("INSERT INTO cart (user_id, item_id, quantity) VALUES (?, ?, ?)",
+                    (user_id, item_id, rng.randint(1, 3)))
+    db.close()
+
+    return {"users": users, "items": items, "carts": carts, "admin_id": 1}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill a database with benchmark data")
+    parser.add_argument("database")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--carts", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    seed(args.database, args.users, args.items, args.orders, args.carts, rng_seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
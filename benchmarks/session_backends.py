@@ -0,0 +1,100 @@
+# Per-request overhead of the session backends (see session_utils.py)
+
+# Every backend serves the same two routes through Flask's test client: one
+# that reads the session (a logged-in page view) and one that writes it (e.g.,
+# a flashed message). A route without a session cookie is the baseline.
+#
+# Usage: python -m benchmarks.session_backends [--requests N] [--json]
+from flask import Flask, session
+import argparse
+from benchmarks.timing import time_calls
+import db_utils
+import json
+import os
+import session_utils
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_app(backend: str, folder: str) -> Flask:
+    """Create a bare app (no other routes) using a session backend."""
+    app = Flask(__name__, root_path=ROOT)
+    app.config["DATABASE"] = os.path.join(folder, "store.db")
+    app.config["SECRET_KEY"] = "benchmark"
+    app.config["SESSION_PERMANENT"] = False
+    app.config["SESSION_TYPE"] = "filesystem"
+    app.config["SESSION_FILE_DIR"] = os.path.join(folder, "flask_session")
+    app.config["SESSION_SWEEP_INTERVAL"] = 0
+    app.config["DB_AUTO_MIGRATE"] = True
+
+    db_utils.init_db(app)
+    session_utils.init_app(app, backend)
+    app.teardown_appcontext(db_utils.release_db)
+
+    @app.route("/login")
+    def login():
+        session["user_id"] = 1
+        return ""
+
+    @app.route("/read")
+    def read():
+        return str(session.get("user_id"))
+
+    @app.route("/write")
+    def write():
+        session["counter"] = session.get("counter", 0) + 1
+        return ""
+
+    return app
+
+
+def measure(client, path: str, requests: int) -> dict:
+    """Time `requests` requests to a path (in microseconds)."""
+    return time_calls(lambda: client.get(path), requests)
+
+
+def run(requests: int = 2000) -> dict:
+    """Benchmark every backend; returns {backend: {route: timings}}."""
+    results = {}
+
+    for backend in session_utils.BACKENDS:
+        with tempfile.TemporaryDirectory() as folder:
+            app = make_app(backend, folder)
+
+            # Without a session cookie (nothing to load)
+            anonymous = app.test_client()
+            measure(anonymous, "/read", requests // 10) # Warm up
+            results[backend] = {"baseline": measure(anonymous, "/read", requests)}
+
+            client = app.test_client()
+            client.get("/login")
+            results[backend]["read"] = measure(client, "/read", requests)
+            results[backend]["write"] = measure(client, "/write", requests)
+
+            db_utils.close_pools(app)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request overhead of the session backends")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.requests)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'backend':<12}{'route':<10}{'mean (us)':>12}{'p50 (us)':>12}{'p95 (us)':>12}")
+    for backend, routes in results.items():
+        for route, timings in routes.items():
+            print(f"{backend:<12}{route:<10}{timings['mean_us']:>12}{timings['p50_us']:>12}"
+                f"{timings['p95_us']:>12}")
+
+
+if __name__ == "__main__":
+    main()
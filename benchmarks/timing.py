@@ -0,0 +1,40 @@
+# Timing helpers shared by the benchmarks
+
+from db_profiler import percentile
+import statistics
+import time
+
+
+def summarize(timings: list) -> dict:
+    """Summarize durations (in microseconds): mean, p50/p95/p99 and throughput."""
+    timings = sorted(timings)
+    total = sum(timings)
+    return {
+        "n": len(timings),
+        "mean_us": round(statistics.fmean(timings), 1) if timings else 0.0,
+        "p50_us": round(percentile(timings, 50), 1),
+        "p95_us": round(percentile(timings, 95), 1),
+        "p99_us": round(percentile(timings, 99), 1),
+        "per_second": round(len(timings) / (total / 1e6), 1) if total else 0.0,
+    }
+
+
+def time_calls(fn, n: int, warmup: int = 0, setup=None) -> dict:
+    """
+    Call `fn` `n` times (after `warmup` untimed calls) and summarize the
+    durations. `setup`, if given, runs untimed before every call.
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+
+    timings = []
+    for _ in range(n):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1e6)
+
+    return summarize(timings)
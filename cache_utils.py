@@ -0,0 +1,52 @@
+# In-process caches
+
+# A small LRU cache shared by the rendered-fragment cache (fragments.py) and
+# the search result cache (search_utils.py). Each worker has its own.
+from collections import OrderedDict
+import threading
+import time
+
+
+class LRUCache:
+    """
+    A thread-safe LRU cache holding at most `maxsize` entries. With a `ttl`,
+    entries also expire `ttl` seconds after they were stored.
+    Counts hits and misses (shown on /admin/metrics).
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict() # key -> (expiry or None, value)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return a cached value, or `None` if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[0] is not None and entry[0] < time.monotonic()):
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        """Cache a value, evicting the least recently used entries if full."""
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
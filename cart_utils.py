@@ -0,0 +1,85 @@
+# Shopping cart queries, shared by the cart pages and the JSON cart API
+
+from flask import current_app
+import db_utils
+
+# Columns of a cart line as returned by the JSON cart API
+LINE_COLUMNS = """
+    items.id, items.title, items.price_cents, cart.quantity,
+    items.price_cents * cart.quantity AS subtotal_cents"""
+
+
+def add(user_id: int, item_id: int, qty: int):
+    """
+    Add `qty` (at least 1) of an item to a user's cart in one atomic statement
+    (only if the item exists), keeping the quantity at most CART_MAX_QTY.
+    Raises `ValueError` if qty is less than 1.
+    """
+    if qty < 1:
+        raise ValueError(f"Invalid quantity: {qty!r}")
+
+    max_qty = current_app.config["CART_MAX_QTY"]
+    db_utils.execute("""
+        INSERT INTO cart (user_id, item_id, quantity)
+        SELECT ?, id, MIN(?, ?) FROM items WHERE id = ?
+        ON CONFLICT (user_id, item_id)
+        DO UPDATE SET quantity = MIN(cart.quantity + excluded.quantity, ?)""",
+        (user_id, qty, max_qty, item_id, max_qty))
+
+
+def set_quantity(user_id: int, item_id: int, qty: int) -> int:
+    """
+    Set the quantity (at least 1, at most CART_MAX_QTY) of an item already in
+    a user's cart. Returns the number of updated rows (0 if the item isn't in
+    the cart). Raises `ValueError` if qty is less than 1.
+    """
+    if qty < 1:
+        raise ValueError(f"Invalid quantity: {qty!r}")
+
+    return db_utils.execute("UPDATE cart SET quantity = MIN(?, ?) WHERE user_id = ? AND item_id = ?",
+        (qty, current_app.config["CART_MAX_QTY"], user_id, item_id))
+
+
+def remove(user_id: int, item_id: int) -> int:
+    """Remove an item from a user's cart. Returns the number of deleted rows."""
+    return db_utils.execute("DELETE FROM cart WHERE item_id = ? AND user_id = ?",
+        (item_id, user_id))
+
+
+def get_lines(user_id: int) -> list:
+    """Return the items (`dict`) in a user's cart, with their quantity."""
+    return db_utils.execute(
+        "SELECT * FROM cart JOIN items ON items.id = cart.item_id WHERE cart.user_id = ?",
+        (user_id,))
+
+
+def get_summary(user_id: int) -> list:
+    """Return every line of a user's cart (item, quantity and subtotal)."""
+    return db_utils.execute(f"""
+        SELECT {LINE_COLUMNS}
+        FROM cart JOIN items ON items.id = cart.item_id
+        WHERE cart.user_id = ?""",
+        (user_id,))
+
+
+def get_line(user_id: int, item_id: int):
+    """
+    Return one line of a user's cart (item, quantity and subtotal),
+    or `None` if the item is not in the cart.
+    """
+    rows = db_utils.execute(f"""
+        SELECT {LINE_COLUMNS}
+        FROM cart JOIN items ON items.id = cart.item_id
+        WHERE cart.user_id = ? AND cart.item_id = ?""",
+        (user_id, item_id))
+    return rows[0] if rows else None
+
+
+def get_total(user_id: int):
+    """Return the total price (in cents) of a user's cart, computed by the database."""
+    rows = db_utils.execute("""
+        SELECT COALESCE(SUM(items.price_cents * cart.quantity), 0) AS total_cents
+        FROM cart JOIN items ON items.id = cart.item_id
+        WHERE cart.user_id = ?""",
+        (user_id,))
+    return rows[0]["total_cents"]
@@ -0,0 +1,147 @@
+# In-process catalog (items) cache
+
+# The catalog is read on almost every storefront request but only changes when
+# an admin adds, edits or deletes an item. Each worker keeps a copy of it in
+# memory and only checks a one-row version stamp (`catalog_version`, bumped by
+# triggers in migrations/0004_version_triggers.sql) to find out whether
+# another worker changed it.
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from flask import current_app, g
+import db_utils
+import threading
+import time
+
+# An immutable copy of the catalog at a given version
+Snapshot = namedtuple("Snapshot", ["version", "by_id", "listing", "ids"])
+
+# One page of the listing; `prev`/`next` are the cursors (item ids) for the
+# `?before=`/`?after=` links, or `None` if there is no such page
+Page = namedtuple("Page", ["items", "prev", "next", "limit"])
+
+
+class CatalogCache:
+    """
+    Holds the current catalog `Snapshot` of one application.
+    """
+
+    def __init__(self, check_interval: float = 1.0):
+        # How long (in seconds) a snapshot is trusted before the stamp is checked again
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._checked_at = 0.0
+
+    def snapshot(self) -> Snapshot:
+        """
+        Return an up-to-date snapshot, reloading the catalog only if the
+        version stamp in the database moved.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return snapshot
+
+        with self._lock:
+            # Another thread may have refreshed it while we were waiting
+            snapshot = self._snapshot
+            if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return snapshot
+
+            version = current_version()
+            if snapshot is None or snapshot.version != version:
+                snapshot = self._snapshot = load()
+
+            self._checked_at = time.monotonic()
+            return snapshot
+
+    def invalidate(self):
+        """Drop the snapshot, so the next read reloads the catalog."""
+        with self._lock:
+            self._snapshot = None
+            self._checked_at = 0.0
+
+
+def current_version() -> int:
+    """Return the catalog's version stamp from the database."""
+    rows = db_utils.execute("SELECT version FROM catalog_version WHERE id = 1",
+        row_type=db_utils.ROW_TUPLE)
+    return rows[0][0] if rows else 0
+
+
+def load() -> Snapshot:
+    """Read the whole catalog (and its version) from the database."""
+
+    # Read both in one (read-only) transaction, so the version matches the rows
+    with db_utils.transaction(read_only=True):
+        version = current_version()
+        listing = tuple(db_utils.execute("SELECT * FROM items ORDER BY id"))
+
+    return Snapshot(version, {item["id"]: item for item in listing}, listing,
+        tuple(item["id"] for item in listing))
+
+
+def get_cache(app=None) -> CatalogCache:
+    """Return the catalog cache of an application, creating it on first use."""
+    app = app or current_app._get_current_object()
+    cache = app.extensions.get("catalog")
+    if cache is None:
+        cache = app.extensions.setdefault(
+            "catalog", CatalogCache(app.config.get("CATALOG_CHECK_INTERVAL", 1.0))
+        )
+    return cache
+
+
+def _current() -> Snapshot:
+    # Use one snapshot for the whole request
+    snapshot = g.get("_catalog")
+    if snapshot is None:
+        snapshot = g._catalog = get_cache().snapshot()
+    return snapshot
+
+
+def get_item(id: int):
+    """Return an item (`dict`) by its id, or `None` if there is no such item."""
+    return _current().by_id.get(id)
+
+
+def get_page(after: int = None, before: int = None, limit: int = 24) -> Page:
+    """
+    Return one page of items using keyset pagination on the item id:
+    the items right after `after`, or right before `before` (or the first page).
+    Finding the page is a binary search, so page 1000 costs the same as page 1.
+    """
+    snapshot = _current()
+    ids = snapshot.ids
+
+    if before is not None:
+        end = bisect_left(ids, before)
+        start = max(0, end - limit)
+    else:
+        start = bisect_right(ids, after) if after is not None else 0
+        end = start + limit
+
+    items = snapshot.listing[start:end]
+    if not items:
+        return Page(items, None, None, limit)
+
+    return Page(
+        items,
+        items[0]["id"] if start > 0 else None,
+        items[-1]["id"] if end < len(ids) else None,
+        limit,
+    )
+
+
+def version() -> int:
+    """Return the version of the catalog this request sees."""
+    return _current().version
+
+
+def invalidate():
+    """
+    Call after changing items: drops this worker's copy of the catalog.
+    (Other workers notice the change through the version stamp.)
+    """
+    get_cache().invalidate()
+    g.pop("_catalog", None)
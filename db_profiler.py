@@ -0,0 +1,162 @@
+# Query profiler and slow-query log
+
+# With DB_PROFILE on, `db_utils.execute` reports every statement here. The
+# profiler keeps, per normalized SQL statement and per endpoint, counts and
+# recent durations (for p50/p95/p99), logs statements slower than
+# DB_SLOW_QUERY_MS together with their `EXPLAIN QUERY PLAN`, and adds a
+# `Server-Timing` header with each request's query count and DB time.
+# The numbers are per worker; /admin/metrics shows them. With DB_PROFILE off
+# nothing is set up and `execute` skips timing altogether.
+from collections import deque
+from flask import g, request
+from functools import lru_cache
+import re
+import threading
+import time
+
+# Durations kept per statement/endpoint for the percentiles
+SAMPLES = 1000
+
+# Slow statements kept for /admin/metrics
+SLOW_QUERIES = 50
+
+
+@lru_cache(maxsize=512)
+def normalize(query: str) -> str:
+    """
+    Return the shape of a statement: whitespace collapsed and `IN (?, ?, ...)`
+    lists folded, so the same statement with different arguments is counted once.
+    """
+    query = " ".join(query.split())
+    return re.sub(r"\bIN \(\?(?:, ?\?)+\)", "IN (?, ...)", query, flags=re.IGNORECASE)
+
+
+def percentile(samples: list, p: float) -> float:
+    """Return the p-th percentile (nearest rank) of sorted samples."""
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+
+class Histogram:
+    """Count and total of a measurement, with its most recent SAMPLES values."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=SAMPLES)
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+
+    def summary(self) -> dict:
+        samples = sorted(self.samples)
+        return {
+            "count": self.count,
+            "total_ms": round(self.total, 3),
+            "p50_ms": round(percentile(samples, 50), 3),
+            "p95_ms": round(percentile(samples, 95), 3),
+            "p99_ms": round(percentile(samples, 99), 3),
+        }
+
+
+class Profiler:
+    """Collects query and per-request DB metrics of one application (thread-safe)."""
+
+    def __init__(self, logger, slow_query_ms: float = 100.0):
+        self.logger = logger
+        self.slow_query_ms = slow_query_ms
+
+        self._lock = threading.Lock()
+        self.statements = {}
+        self.endpoints = {}
+        self.slow = deque(maxlen=SLOW_QUERIES)
+        self._plans = {}
+
+    def record(self, db, query: str, args, duration: float):
+        """Record one statement (called by `db_utils.execute`); `duration` is in ms."""
+        statement = normalize(query)
+
+        with self._lock:
+            histogram = self.statements.get(statement)
+            if histogram is None:
+                histogram = self.statements[statement] = Histogram()
+            histogram.add(duration)
+
+        # Per-request totals
+        g._db_queries = g.get("_db_queries", 0) + 1
+        g._db_time = g.get("_db_time", 0.0) + duration
+
+        if duration >= self.slow_query_ms:
+            plan = self.explain(db, statement, query, args)
+            self.logger.warning("Slow query (%.2fms): %s\n%s", duration, statement, plan)
+            with self._lock:
+                self.slow.append({
+                    "at": int(time.time()),
+                    "duration_ms": round(duration, 3),
+                    "query": statement,
+                    "plan": plan,
+                })
+
+    def explain(self, db, statement: str, query: str, args) -> str:
+        """Return the query plan of a statement (once per statement shape)."""
+        plan = self._plans.get(statement)
+        if plan is None:
+            try:
+                cur = db.cursor()
+                cur.row_factory = None
+                rows = cur.execute("EXPLAIN QUERY PLAN " + query,
+                    args if isinstance(args, (tuple, dict)) else ()).fetchall()
+                cur.close()
+                plan = "\n".join(row[3] for row in rows)
+            except Exception as e:
+                plan = f"(no plan: {e})"
+            self._plans[statement] = plan
+        return plan
+
+    def record_request(self, response):
+        """Record the DB time of a request and report it in `Server-Timing`."""
+        queries = g.get("_db_queries", 0)
+        duration = g.get("_db_time", 0.0)
+
+        with self._lock:
+            histogram = self.endpoints.get(request.endpoint)
+            if histogram is None:
+                histogram = self.endpoints[request.endpoint] = Histogram()
+            histogram.add(duration)
+
+        response.headers.add("Server-Timing", f'db;dur={duration:.2f};desc="{queries} queries"')
+        return response
+
+    def report(self) -> dict:
+        """Return every metric (for /admin/metrics)."""
+        with self._lock:
+            statements = {sql: h.summary() for sql, h in self.statements.items()}
+            endpoints = {str(name): h.summary() for name, h in self.endpoints.items()}
+            slow = list(self.slow)
+
+        return {
+            "slow_query_ms": self.slow_query_ms,
+            "statements": dict(sorted(statements.items(),
+                key=lambda entry: entry[1]["total_ms"], reverse=True)),
+            "endpoints": dict(sorted(endpoints.items(),
+                key=lambda entry: entry[1]["total_ms"], reverse=True)),
+            "slow_queries": slow[::-1],
+        }
+
+
+def init_app(app):
+    """Set up the profiler of an application if DB_PROFILE is on."""
+    if not app.config.get("DB_PROFILE"):
+        return
+
+    profiler = app.extensions["db_profiler"] = Profiler(
+        app.logger, app.config.get("DB_SLOW_QUERY_MS", 100.0))
+    app.after_request(profiler.record_request)
+
+
+def get_profiler(app):
+    """Return the profiler of an application, or `None` if profiling is off."""
+    return app.extensions.get("db_profiler")
@@ -2,12 +2,44 @@
 
 # Flask.g is a global object provided by Flask which can be used to store data
 # and it will be available throughout the lifespan of a single request
+from collections import namedtuple
+from contextlib import contextmanager
 from flask import current_app, g
+from functools import lru_cache
+import importlib.util
+import os
+import pathlib
+import queue
 import re
 import sqlite3
+import threading
 import time
 from typing import Union
 
+# Per-connection PRAGMAs, applied once when a pooled connection is opened
+# (the values can be overridden through the application config)
+DEFAULT_PRAGMAS = {
+    "DB_JOURNAL_MODE": "WAL",
+    "DB_SYNCHRONOUS": "NORMAL",
+    "DB_MMAP_SIZE": 64 * (1024 * 1024), # 64 MB
+    "DB_CACHE_SIZE": -16000, # Negative values are in KiB (i.e., ~16 MB)
+    "DB_BUSY_TIMEOUT": 5000, # ms
+}
+
+# Versioned schema migrations: numbered .sql/.py files in this folder (of the
+# app's root), applied in order by `migrate`; the database's `user_version`
+# is the number of the last one applied
+MIGRATIONS_FOLDER = "migrations"
+MIGRATION_PATTERN = re.compile(r"^(\d+)_\w+\.(sql|py)$")
+
+# Row types `execute` can return for a `SELECT`
+ROW_DICT = "dict"
+ROW_ROW = "row" # sqlite3.Row (index and key access, no per-row dict)
+ROW_TUPLE = "tuple"
+
+# A query classified once and cached by its SQL text
+CompiledQuery = namedtuple("CompiledQuery", ["sql", "type"])
+
 
 def dict_factory(cursor, row):
     """
@@ -18,56 +50,549 @@ def dict_factory(cursor, row):
     return {key: value for key, value in zip(fields, row)}
 
 
+def make_row_factory(description):
+    """
+    Build a row factory for a given `cursor.description` once, so that
+    turning a row into a dict costs a single `zip`.
+    """
+    fields = tuple(column[0] for column in description)
+
+    def factory(row):
+        return dict(zip(fields, row))
+
+    return factory
+
+
+def fetch_rows(cur: sqlite3.Cursor, row_type: str = ROW_DICT) -> list:
+    """
+    Fetch all remaining rows of `cur` as a `list` of `row_type`.
+    """
+    rows = cur.fetchall()
+
+    if row_type == ROW_DICT and cur.description is not None:
+        return list(map(make_row_factory(cur.description), rows))
+    return rows
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection became available in time."""
+
+
+class ConnectionPool:
+    """
+    A bounded, thread-safe pool of long-lived SQLite connections.
+
+    Connections are opened lazily (up to `max_size`), configured once and then
+    handed out to requests and put back on teardown instead of being closed.
+    With `read_only`, connections are opened with `mode=ro` and `query_only`,
+    so they can never write (or take a write lock).
+    """
+
+    def __init__(self, database: str, max_size: int = 8, timeout: float = 10.0,
+                 pragmas: dict = None, statement_cache: int = 256, read_only: bool = False):
+        self.database = database
+        self.read_only = read_only
+        self.statement_cache = statement_cache
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pragmas = pragmas or {}
+
+        # LIFO, so the most recently used (i.e., warmest) connection is reused first
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._size = 0
+
+        # Metrics
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections move between threads, but only ever belong to one at a time
+        if self.read_only:
+            uri = pathlib.Path(self.database).resolve().as_uri() + "?mode=ro"
+            db = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                                 cached_statements=self.statement_cache)
+            db.execute("PRAGMA query_only = 1")
+        else:
+            db = sqlite3.connect(self.database, check_same_thread=False,
+                                 cached_statements=self.statement_cache)
+
+        db.execute(f"PRAGMA busy_timeout = {int(self.pragmas['DB_BUSY_TIMEOUT'])}")
+        # The journal mode is stored in the database file: only writers set it
+        if not self.read_only:
+            db.execute(f"PRAGMA journal_mode = {self.pragmas['DB_JOURNAL_MODE']}")
+        db.execute(f"PRAGMA synchronous = {self.pragmas['DB_SYNCHRONOUS']}")
+        db.execute(f"PRAGMA mmap_size = {int(self.pragmas['DB_MMAP_SIZE'])}")
+        db.execute(f"PRAGMA cache_size = {int(self.pragmas['DB_CACHE_SIZE'])}")
+
+        # Use a custom row_factory (queries return a `dict` instead of a `tuple`)
+        db.row_factory = dict_factory
+        return db
+
+    def acquire(self) -> sqlite3.Connection:
+        """Check a connection out of the pool, opening a new one if allowed."""
+
+        try:
+            db = self._idle.get_nowait()
+        except queue.Empty:
+            db = None
+
+        if db is None:
+            with self._lock:
+                can_open = self._size < self.max_size
+                if can_open:
+                    self._size += 1
+
+            if can_open:
+                try:
+                    db = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                    raise
+            else:
+                # Pool is exhausted, wait for another request to give one back
+                start = time.perf_counter()
+                try:
+                    db = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._timeouts += 1
+                    raise PoolTimeout(
+                        f"No database connection available after {self.timeout}s"
+                    )
+                waited = time.perf_counter() - start
+
+                with self._lock:
+                    self._waits += 1
+                    self._wait_total += waited
+                    self._wait_max = max(self._wait_max, waited)
+
+        with self._lock:
+            self._checkouts += 1
+        return db
+
+    def release(self, db: sqlite3.Connection):
+        """Give a connection back to the pool."""
+
+        # Never hand out a connection with a half-finished transaction
+        if db.in_transaction:
+            db.rollback()
+        self._idle.put(db)
+
+    def close(self):
+        """Close every idle connection (e.g., on shutdown or in tests)."""
+
+        while True:
+            try:
+                db = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            db.close()
+            with self._lock:
+                self._size -= 1
+
+    def stats(self) -> dict:
+        """Return size and checkout-wait metrics of the pool."""
+
+        with self._lock:
+            idle = self._idle.qsize()
+            return {
+                "read_only": self.read_only,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": idle,
+                "in_use": self._size - idle,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_total_ms": self._wait_total * 1000,
+                "wait_max_ms": self._wait_max * 1000,
+                "wait_avg_ms": (self._wait_total / self._waits * 1000) if self._waits else 0.0,
+                "timeouts": self._timeouts,
+            }
+
+
+# Guards the lazy creation of an application's pools
+_pool_lock = threading.Lock()
+
+
+def get_pool(app=None, write: bool = False) -> ConnectionPool:
+    """
+    Return the reader (or, with `write`, the writer) connection pool of an
+    application, creating it on first use.
+
+    With DB_READ_ONLY_CONNECTIONS on, readers are read-only connections
+    (DB_POOL_SIZE of them) and writes go through a separate pool of
+    DB_WRITER_POOL_SIZE connections; in WAL mode readers never wait for a
+    writer. With it off, both are the same (read-write) pool.
+    """
+    app = app or current_app._get_current_object()
+    split = app.config.get("DB_READ_ONLY_CONNECTIONS", False)
+    name = "db_writer_pool" if write and split else "db_pool"
+
+    pool = app.extensions.get(name)
+    if pool is None:
+        with _pool_lock:
+            pool = app.extensions.get(name)
+            if pool is None:
+                pool = app.extensions[name] = ConnectionPool(
+                    app.config["DATABASE"],
+                    max_size=(app.config.get("DB_WRITER_POOL_SIZE", 2) if name == "db_writer_pool"
+                              else app.config.get("DB_POOL_SIZE", 8)),
+                    timeout=app.config.get("DB_POOL_TIMEOUT", 10.0),
+                    statement_cache=app.config.get("DB_STATEMENT_CACHE", 256),
+                    pragmas={key: app.config.get(key, value)
+                             for key, value in DEFAULT_PRAGMAS.items()},
+                    read_only=split and not write,
+                )
+    return pool
+
+
+def close_pools(app=None):
+    """Close the idle connections of an application's pools (e.g., in benchmarks)."""
+    app = app or current_app._get_current_object()
+    for name in ("db_pool", "db_writer_pool"):
+        pool = app.extensions.get(name)
+        if pool is not None:
+            pool.close()
+
+
 def get_db():
     """
-    Open a new database connection and return a reference to it.
+    Check a reader connection out of the pool and return a reference to it.
+    The same connection is reused until the end of the request.
+    (Read-only if DB_READ_ONLY_CONNECTIONS is on: use `writer()` to write.)
     """
     db = getattr(g, "_database", None)
     if db is None:
-        # Open a new database connection
-        db = g._database = sqlite3.connect(current_app.config["DATABASE"])
-        # Use a custom row_factory (queries return a `dict` instead of a `tuple`)
-        db.row_factory = dict_factory
+        db = g._database = get_pool().acquire()
     return db
 
 
+def release_db(exception=None):
+    """
+    Return the request's reader connection (if any) to the pool.
+    """
+    db = g.pop("_database", None)
+    if db is not None:
+        get_pool().release(db)
+
+
+def acquire_writer() -> tuple:
+    """
+    Return a connection to write with, and the pool to give it back to when
+    done (`None` if it isn't ours to give back):
+    - inside a `transaction()` block, the transaction's connection;
+    - with DB_READ_ONLY_CONNECTIONS on, a connection of the writer pool;
+    - otherwise (one shared pool), the request's connection if it has one,
+      so a request never holds one connection while waiting for a second.
+    """
+    db = g.get("_transaction_db")
+    if db is not None:
+        return db, None
+
+    pool = get_pool(write=True)
+    if pool is get_pool():
+        db = g.get("_database")
+        if db is not None:
+            return db, None
+
+    return pool.acquire(), pool
+
+
+@contextmanager
+def writer():
+    """
+    Use a writer connection for the duration of the block (see `acquire_writer`).
+
+    Writer connections are only held while writing, not for the whole
+    request, so a handful of them serve every request of a worker.
+    """
+    db, pool = acquire_writer()
+    try:
+        yield db
+    finally:
+        if pool is not None:
+            pool.release(db)
+
+
+def pool_stats() -> dict:
+    """Return the metrics of the current application's reader and writer pools."""
+    return {"read": get_pool().stats(), "write": get_pool(write=True).stats()}
+
+
 def get_query_type(query: str) -> str:
     match = re.match(r"^\s*(\w+)", query)
     return match.group(1).upper() if match else ""
 
 
+@lru_cache(maxsize=512)
+def compile_query(query: str) -> CompiledQuery:
+    """
+    Classify a query once; later calls with the same SQL text are a cache hit.
+    (SQLite itself keeps the prepared statements, see `DB_STATEMENT_CACHE`.)
+    """
+    return CompiledQuery(query, get_query_type(query))
+
+
+def has_fts5(db: sqlite3.Connection) -> bool:
+    """
+    Check whether the SQLite library was built with the FTS5 extension.
+    """
+    try:
+        db.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5 (x)")
+        db.execute("DROP TABLE temp.fts5_probe")
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def table_exists(db: sqlite3.Connection, table: str) -> bool:
+    """Check whether a table exists in the database."""
+    rows = db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (table,)).fetchall()
+    return len(rows) > 0
+
+
+def run_script(db: sqlite3.Connection, script: str):
+    """
+    Execute an SQL script one statement at a time. Unlike `executescript`,
+    this doesn't commit first, so the script can be part of a transaction.
+    """
+    statement = ""
+    for part in script.split(";"):
+        statement += part + ";"
+
+        # A `;` inside e.g. a trigger body doesn't end the statement
+        if sqlite3.complete_statement(statement):
+            db.execute(statement)
+            statement = ""
+
+
+def schema_version(db: sqlite3.Connection) -> int:
+    """Return the number of the last migration applied to a database."""
+    cur = db.cursor()
+    cur.row_factory = None
+    version = cur.execute("PRAGMA user_version").fetchone()[0]
+    cur.close()
+    return version
+
+
+def list_migrations(folder: str) -> list:
+    """Return the migrations in a folder as (version, path), in order."""
+    migrations = []
+    for name in os.listdir(folder):
+        match = MIGRATION_PATTERN.match(name)
+        if match:
+            migrations.append((int(match.group(1)), os.path.join(folder, name)))
+    return sorted(migrations)
+
+
+def apply_migration(db: sqlite3.Connection, path: str):
+    """Apply one migration: an SQL script, or a Python module's `upgrade(db)`."""
+    if path.endswith(".sql"):
+        with open(path) as f:
+            run_script(db, f.read())
+    else:
+        spec = importlib.util.spec_from_file_location(
+            f"migration_{os.path.basename(path)[:-3]}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.upgrade(db)
+
+
+def migrate(database: str, folder: str, logger=None) -> list:
+    """
+    Apply the migrations of `folder` that `database` doesn't have yet, each in
+    its own transaction together with the new `user_version`. Safe to run
+    from several processes at once. Returns the versions applied.
+    """
+    db = sqlite3.connect(database, isolation_level=None, timeout=30.0)
+    applied = []
+
+    try:
+        db.execute(f"PRAGMA journal_mode = {DEFAULT_PRAGMAS['DB_JOURNAL_MODE']}")
+
+        for version, path in list_migrations(folder):
+            if version <= schema_version(db):
+                continue
+
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                # Another process may have applied it while we waited for the lock
+                if version <= schema_version(db):
+                    db.execute("ROLLBACK")
+                    continue
+
+                apply_migration(db, path)
+                db.execute(f"PRAGMA user_version = {version}")
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+            applied.append(version)
+            if logger:
+                logger.info(f"Applied migration {os.path.basename(path)}")
+    finally:
+        db.close()
+
+    return applied
+
+
+def upgrade_db(app) -> list:
+    """Apply an application's pending migrations (`flask db upgrade`). Returns their versions."""
+    return migrate(app.config["DATABASE"], os.path.join(app.root_path, MIGRATIONS_FOLDER),
+        app.logger)
+
+
 def init_db(app):
     """
-    Initializes a database with a given schema.
+    Check, on worker startup, that the database has every migration (a read
+    of `user_version`); migrations only run here if DB_AUTO_MIGRATE is on,
+    otherwise through `flask db upgrade` once per deploy.
+
+    Sets `app.config["FTS5_ENABLED"]`, telling routes whether the full-text
+    search index (migrations/items_fts.sql) is available.
     """
+    latest = max((version for version, _ in
+        list_migrations(os.path.join(app.root_path, MIGRATIONS_FOLDER))), default=0)
+
+    # A writer: it creates the database file if there's none yet
+    with app.app_context(), writer() as db:
+        current = schema_version(db)
 
-    with app.app_context():
-        db = get_db()
-        with app.open_resource("schema.sql", mode="r") as f:
-            db.cursor().executescript(f.read())
-        db.commit()
+    if current < latest:
+        if app.config.get("DB_AUTO_MIGRATE"):
+            upgrade_db(app)
+        else:
+            app.logger.warning(
+                f"Database is at schema version {current}, the app needs {latest}: "
+                "run `flask db upgrade`")
+
+    # A writer: probing for FTS5 creates a temporary table
+    with app.app_context(), writer() as db:
+        app.config["FTS5_ENABLED"] = has_fts5(db) and table_exists(db, "items_fts")
+        if not app.config["FTS5_ENABLED"]:
+            app.logger.warning("No full-text search index, search falls back to LIKE")
+
+
+def in_transaction() -> bool:
+    """Return `True` while a `transaction()` block is open in this request."""
+    return g.get("_transaction_depth", 0) > 0
+
+
+@contextmanager
+def transaction(immediate: bool = True, read_only: bool = False):
+    """
+    Run a block of `execute` calls as one unit of work.
+
+    Inside the block `execute` skips its implicit commit; the transaction is
+    committed when the outermost block exits and rolled back if it raises.
+    Nested blocks become savepoints, so an inner failure only undoes its own
+    statements. `immediate` takes the write lock up front (`BEGIN IMMEDIATE`),
+    which avoids lock upgrade deadlocks for read-then-write blocks.
+
+    The block runs on a writer connection, checked out until it exits; with
+    `read_only` it runs on the request's reader connection instead (a
+    consistent snapshot for several `SELECT`s, which never waits for writers).
+
+    Usage:
+        with db_utils.transaction():
+            db_utils.execute("INSERT ...", rows, executemany=True)
+            db_utils.execute("DELETE ...", (user_id,))
+    """
+    depth = g.get("_transaction_depth", 0)
+    savepoint = f"sp_{depth}"
+    pool = None
+
+    if depth == 0:
+        if read_only:
+            db = get_db()
+            db.execute("BEGIN")
+        else:
+            db, pool = acquire_writer()
+            try:
+                db.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            except BaseException:
+                if pool is not None:
+                    pool.release(db)
+                raise
+        g._transaction_db = db
+    else:
+        db = g._transaction_db
+        db.execute(f"SAVEPOINT {savepoint}")
+
+    g._transaction_depth = depth + 1
+
+    try:
+        yield db
+    except BaseException:
+        g._transaction_depth = depth
+        if depth == 0:
+            db.rollback()
+        else:
+            db.execute(f"ROLLBACK TO {savepoint}")
+            db.execute(f"RELEASE {savepoint}")
+        raise
+    else:
+        g._transaction_depth = depth
+        if depth == 0:
+            db.commit()
+        else:
+            db.execute(f"RELEASE {savepoint}")
+    finally:
+        if depth == 0:
+            g.pop("_transaction_db", None)
+            if pool is not None:
+                pool.release(db)
 
 
-def execute(query: str, args: Union[tuple, list] = (), executemany: bool = False):
+def execute(query: str, args: Union[tuple, list] = (), executemany: bool = False,
+            row_type: str = ROW_DICT):
     """
     Execute one or many SQL queries.
 
+    `row_type` selects what a `SELECT` returns per row: `ROW_DICT` (default),
+    `ROW_ROW` (`sqlite3.Row`) or `ROW_TUPLE` (plain tuples, fastest).
+
+    Writes are committed right away, unless a `transaction()` block is open.
+    `SELECT`s outside a transaction run on the request's reader connection;
+    writes check a writer connection out just for the statement.
+
     Returns:
         - For `DELETE`/`UPDATE`, the number of rows deleted/updated;
         - For `INSERT`, the primary key of a newly inserted row, or
             the number of inserted rows if executemany=True and args is a list;
         - For `SELECT`, a `list` of `dict` (dictionaries), each of which represents
-            a row;
+            a row (or of `row_type`);
     """
-    db = get_db()
-    query_type = get_query_type(query)
+    query_type = compile_query(query).type
+
+    # Inside a transaction: its connection; otherwise a reader, or a writer for writes
+    db = g.get("_transaction_db")
+    writer_pool = None
+    if db is None:
+        if query_type == "SELECT":
+            db = get_db()
+        else:
+            db, writer_pool = acquire_writer()
+
     cur = db.cursor()
 
-    duration = None
+    # Rows are converted in bulk by `fetch_rows` instead of per row by `dict_factory`
+    cur.row_factory = sqlite3.Row if row_type == ROW_ROW else None
+
     rows_count = None
- 
-    if current_app.config.get("DEBUG_DB"):
-        start = time.time()
+
+    # Time the query only if someone is listening (see db_profiler.py)
+    profiler = current_app.extensions.get("db_profiler")
+    debug = current_app.config.get("DEBUG_DB")
+    if profiler or debug:
+        start = time.perf_counter()
 
     try:
         if query_type == "SELECT":
@@ -75,13 +600,13 @@ def execute(query: str, args: Union[tuple, list] = (), executemany: bool = False
             cur.execute(query, args)
 
             # Fetch all rows
-            rows = cur.fetchall()
+            rows = fetch_rows(cur, row_type)
 
             rows_count = len(rows)
 
-            # The database connection is closed by close_connection in app.py
+            # The database connection is returned to the pool by close_connection in app.py
 
-            # Return a list of rows (`dict`)
+            # Return a list of rows (`dict` by default)
             return rows
         
         elif query_type == "INSERT":
@@ -89,26 +614,24 @@ def execute(query: str, args: Union[tuple, list] = (), executemany: bool = False
                 # Prepare many queries to execute (provide a list here)
                 cur.executemany(query, args)
 
-                # Commit the transaction
-                db.commit()
+                # Commit the transaction (unless a `transaction()` block owns it)
+                if not in_transaction():
+                    db.commit()
 
                 rows_count = cur.rowcount
 
-                # The database connection is closed by close_connection in app.py
-
                 return cur.rowcount
             
             else:
                 # Prepare one query to execute
                 cur.execute(query, args)
 
-                # Commit the transaction
-                db.commit()
+                # Commit the transaction (unless a `transaction()` block owns it)
+                if not in_transaction():
+                    db.commit()
 
                 rows_count = 1
 
-                # The database connection is closed by close_connection in app.py
-
                 return cur.lastrowid
             
         elif query_type in ["UPDATE", "DELETE"]:
@@ -119,29 +642,77 @@ def execute(query: str, args: Union[tuple, list] = (), executemany: bool = False
                 # Prepare one query to execute
                 cur.execute(query, args)
 
-            # Commit the transaction
-            db.commit()
+            # Commit the transaction (unless a `transaction()` block owns it)
+            if not in_transaction():
+                db.commit()
 
             rows_count = cur.rowcount
 
-            # The database connection is closed by close_connection in app.py
-
             return cur.rowcount
         
         else:
             raise ValueError(f"Unhandled SQL query type: {query_type}")
 
     except sqlite3.Error as e:
-        current_app.logger.error(f"DB Error: {e} | Query: {query} | Args: {args}")
+        # Arguments may be personal data (e.g., password hashes): not logged
+        current_app.logger.error("DB Error: %s | Query: %s", e, query)
         raise
 
     finally:
         cur.close()
 
-        if current_app.config.get("DEBUG_DB"):
-            duration = (time.time() - start) * 1000 # ms
-            current_app.logger.debug(
-                f"Executed {query_type} in {duration:.2f}ms | "
-                f"Executemany: {executemany} | Rows: {rows_count} | "
-                f"Query: {query} | Args: {args}"
-            )
+        if profiler or debug:
+            duration = (time.perf_counter() - start) * 1000 # ms
+
+            if profiler:
+                profiler.record(db, query, args, duration)
+            if debug:
+                current_app.logger.debug(
+                    "Executed %s in %.2fms | Executemany: %s | Rows: %s | Query: %s",
+                    query_type, duration, executemany, rows_count, query)
+
+        # The writer goes back right away (readers on teardown, by close_connection)
+        if writer_pool is not None:
+            writer_pool.release(db)
+
+
+def stream(query: str, args: Union[tuple, list] = (), row_type: str = ROW_DICT,
+           chunk_size: int = 1000):
+    """
+    Execute a `SELECT` and yield its rows (of `row_type`) one by one, as a
+    generator: rows are fetched `chunk_size` at a time, so memory use doesn't
+    grow with the size of the result (unlike `execute`, which returns a `list`).
+
+    The query runs on the request's reader connection (`get_db`), so a
+    streamed response must keep the request context alive while iterating
+    (`stream_with_context`); the cursor is closed when the generator is
+    exhausted or closed (e.g., when a client disconnects). The rows are one
+    consistent snapshot of the database.
+
+    Usage:
+        for row in db_utils.stream("SELECT * FROM order_headers ORDER BY id"):
+            ...
+    """
+    query_type = compile_query(query).type
+    if query_type != "SELECT":
+        raise ValueError(f"Only SELECT queries can be streamed, not {query_type}")
+
+    cur = get_db().cursor()
+    cur.row_factory = sqlite3.Row if row_type == ROW_ROW else None
+
+    try:
+        cur.execute(query, args)
+        factory = make_row_factory(cur.description) if row_type == ROW_DICT else None
+
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from (map(factory, rows) if factory else rows)
+
+    except sqlite3.Error as e:
+        current_app.logger.error("DB Error: %s | Query: %s", e, query)
+        raise
+
+    finally:
+        cur.close()
@@ -0,0 +1,141 @@
+# Streaming exports of orders and items (CSV or NDJSON)
+
+# Rows come from `db_utils.stream` and are encoded EXPORT_CHUNK_SIZE at a time,
+# so an export of any size uses constant memory and the first bytes go out
+# as soon as the first rows are read (see the /admin/export/* routes).
+from datetime import datetime, timedelta
+from helpers import dollars
+import csv
+import db_utils
+import io
+import json
+
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Columns of an orders export: one row per order line, with its order's header
+ORDER_COLUMNS = ["order_id", "created_at", "status", "user_id", "username", "order_total",
+    "item_id", "title", "quantity", "unit_price"]
+
+ITEM_COLUMNS = ["id", "title", "price", "description", "filename"]
+
+
+def parse_date(value: str, name: str) -> datetime:
+    """
+    Parse a YYYY-MM-DD date (local time, like the dates shown in the admin panel).
+    Raises `ValueError` naming the parameter if value is not a valid date.
+    """
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"Invalid {name} date: {value!r}, expected YYYY-MM-DD")
+
+
+def order_rows(status: str = None, start: datetime = None, end: datetime = None,
+               chunk_size: int = 1000):
+    """
+    Yield the lines of the orders with a status, placed between two dates
+    (both inclusive; any of them may be `None`), oldest first.
+    """
+    where = []
+    args = []
+    if status:
+        where.append("order_headers.status = ?")
+        args.append(status)
+    if start:
+        where.append("order_headers.created_at >= ?")
+        args.append(int(start.timestamp()))
+    if end:
+        where.append("order_headers.created_at < ?")
+        args.append(int((end + timedelta(days=1)).timestamp()))
+
+    # Both orders walk an index (order_headers_status_created, or the rowid),
+    # so SQLite never has to sort the whole table before the first row
+    order_by = "order_headers.created_at, order_headers.id" if status else "order_headers.id"
+
+    rows = db_utils.stream(f"""
+        SELECT order_headers.id AS order_id, order_headers.created_at, order_headers.status,
+               order_headers.user_id, users.username, order_headers.total_cents,
+               order_lines.item_id, order_lines.title, order_lines.quantity,
+               order_lines.unit_price_cents
+        FROM order_headers
+        JOIN order_lines ON order_lines.order_id = order_headers.id
+        LEFT JOIN users ON users.id = order_headers.user_id
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY {order_by}, order_lines.id""",
+        tuple(args), row_type=db_utils.ROW_TUPLE, chunk_size=chunk_size)
+
+    for (order_id, created_at, status, user_id, username, total_cents,
+         item_id, title, quantity, unit_price_cents) in rows:
+        yield {
+            "order_id": order_id,
+            "created_at": datetime.fromtimestamp(created_at).isoformat(),
+            "status": status,
+            "user_id": user_id,
+            "username": username,
+            "order_total": dollars(total_cents),
+            "item_id": item_id,
+            "title": title,
+            "quantity": quantity,
+            "unit_price": dollars(unit_price_cents),
+        }
+
+
+def item_rows(chunk_size: int = 1000):
+    """Yield every item of the catalog, by id."""
+    rows = db_utils.stream(
+        "SELECT id, title, price_cents, description, filename FROM items ORDER BY id",
+        row_type=db_utils.ROW_TUPLE, chunk_size=chunk_size)
+
+    for id, title, price_cents, description, filename in rows:
+        yield {
+            "id": id,
+            "title": title,
+            "price": dollars(price_cents),
+            "description": description,
+            "filename": filename,
+        }
+
+
+def encode_csv(rows, columns: list, chunk_size: int = 1000):
+    """Yield `rows` (dicts) as CSV text, a header and then `chunk_size` rows at a time."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, columns)
+    writer.writeheader()
+
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    # The rest (or just the header, if there were no rows)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def encode_ndjson(rows, chunk_size: int = 1000):
+    """Yield `rows` (dicts) as newline-delimited JSON, `chunk_size` rows at a time."""
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps(row, ensure_ascii=False))
+        if len(chunk) == chunk_size:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+def encode(rows, format: str, columns: list, chunk_size: int = 1000):
+    """Yield `rows` encoded in an export format ("csv" or "ndjson")."""
+    if format == "csv":
+        return encode_csv(rows, columns, chunk_size)
+    if format == "ndjson":
+        return encode_ndjson(rows, chunk_size)
+    raise ValueError(f"Unknown export format {format!r}, expected one of {tuple(FORMATS)}")
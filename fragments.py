@@ -0,0 +1,39 @@
+# Rendered-fragment cache for item cards
+
+# The item cards of the storefront, the admin items page and the search results
+# only change when their item does. Each card is rendered once per
+# (template, item id, item version) and kept in a per-worker LRU cache, so a
+# page of cards is mostly a string join. `items.version` is a fresh catalog
+# version stamp on every change of the item (see migrations/0004_version_triggers.sql).
+from cache_utils import LRUCache
+from flask import current_app
+from markupsafe import Markup
+
+
+def get_cache(app=None) -> LRUCache:
+    """Return the fragment cache of an application, creating it on first use."""
+    app = app or current_app._get_current_object()
+    cache = app.extensions.get("fragments")
+    if cache is None:
+        cache = app.extensions.setdefault(
+            "fragments", LRUCache(app.config.get("FRAGMENT_CACHE_SIZE", 2048))
+        )
+    return cache
+
+
+def render_card(template: str, item) -> Markup:
+    """Return an item rendered with a card template, from the cache if possible."""
+    cache = get_cache()
+    key = (template, item["id"], item["version"])
+
+    fragment = cache.get(key)
+    if fragment is None:
+        # Render the bare fragment: no request context processors, no signals
+        fragment = Markup(current_app.jinja_env.get_template(template).render(item=item))
+        cache.put(key, fragment)
+    return fragment
+
+
+def render_cards(template: str, items) -> Markup:
+    """Return the cards of several items, joined."""
+    return Markup("").join(render_card(template, item) for item in items)
@@ -1,8 +1,33 @@
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
 from flask import redirect, session
 from functools import wraps
+import re
+import threading
+import time
 
 ALLOWED_EXTENSIONS = set(['png', 'jpg', 'jpeg', 'gif', 'webp', 'bmp'])
 
+# Highest price an item can have, in cents ($1,000,000; well within SQLite's 64-bit INTEGER)
+MAX_PRICE_CENTS = 1_000_000_00
+
+
+def page_args(args, default_limit=24, max_limit=100):
+    """
+    Parse keyset pagination arguments from a request's query string:
+    `?after=<id>` (next page), `?before=<id>` (previous page) and `?limit=`.
+    Invalid values are ignored; `limit` is clamped to [1, max_limit].
+    """
+
+    def to_int(name):
+        try:
+            return int(args.get(name))
+        except (TypeError, ValueError):
+            return None
+
+    limit = to_int("limit") or default_limit
+    return to_int("after"), to_int("before"), max(1, min(limit, max_limit))
+
 
 def login_required(f):
     """
@@ -36,6 +61,67 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def usd(value):
-    """Format value as USD."""
-    return f"${value:,.2f}"
+def timestamp(value):
+    """Format Unix time as local date and time."""
+    return datetime.fromtimestamp(value).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def to_cents(value):
+    """
+    Parse a price in dollars (e.g., "12.5") into integer cents (1250).
+    Raises `ValueError` if value is not a valid price, is negative or is
+    above MAX_PRICE_CENTS.
+    """
+    try:
+        cents = Decimal(str(value).strip()) * 100
+    except InvalidOperation:
+        raise ValueError(f"Invalid price: {value!r}")
+
+    if not cents.is_finite() or cents != cents.to_integral_value():
+        raise ValueError(f"Invalid price: {value!r}")
+    if not 0 <= cents <= MAX_PRICE_CENTS:
+        raise ValueError(f"Price out of range: {value!r}")
+    return int(cents)
+
+
+def dollars(cents, grouping=""):
+    """
+    Format integer cents as a plain amount in dollars (e.g., 1250 -> "12.50");
+    `grouping` is the thousands separator ("," or "_"), none by default.
+    """
+    sign = "-" if cents < 0 else ""
+    whole, fraction = divmod(abs(int(cents)), 100)
+    return f"{sign}{whole:{grouping}}.{fraction:02d}"
+
+
+def usd(cents):
+    """Format integer cents as USD (e.g., -123456 -> "-$1,234.56")."""
+    amount = dollars(abs(int(cents)), grouping=",")
+    return f"-${amount}" if cents < 0 else f"${amount}"
+
+
+def fts_query(q, max_terms=8):
+    """
+    Turn user input into an FTS5 MATCH expression: every word becomes a
+    quoted prefix term (e.g., "app pie" -> '"app"* "pie"*'), so all words
+    must match and FTS5 syntax characters in the input are never interpreted.
+    """
+    terms = re.findall(r"\w+", q.lower())[:max_terms]
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def run_periodically(app, interval: float, fn, name: str, error_message: str):
+    """
+    Call `fn(app)` every `interval` seconds on a daemon thread called `name`.
+    Exceptions are logged (with `error_message`) and the loop goes on.
+    """
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                fn(app)
+            except Exception:
+                app.logger.exception(error_message)
+
+    threading.Thread(target=loop, name=name, daemon=True).start()
@@ -0,0 +1,75 @@
+# Conditional GET (ETag) for pages that only depend on the catalog
+
+# The storefront pages and the search API only change when the catalog does
+# (or when the app is redeployed), so their ETag is derived from the catalog's
+# version stamp instead of the rendered body. A browser revalidating with
+# `If-None-Match` gets a 304 before the view runs: no query, no template render.
+from flask import current_app, make_response, request, session
+from functools import wraps
+import catalog
+import hashlib
+import os
+
+
+def init_app(app):
+    """
+    Compute the release stamp of an application: a hash of its templates and
+    fingerprinted static files, so a redeploy changes every ETag.
+    (Call after assets.init_app.)
+    """
+    digest = hashlib.sha256()
+
+    for root, _, files in sorted(os.walk(os.path.join(app.root_path, app.template_folder))):
+        for name in sorted(files):
+            with open(os.path.join(root, name), "rb") as f:
+                digest.update(name.encode())
+                digest.update(f.read())
+
+    for fingerprinted in sorted(app.extensions["assets"].logical):
+        digest.update(fingerprinted.encode())
+
+    app.extensions["http_cache"] = digest.hexdigest()[:16]
+
+
+def catalog_etag() -> str:
+    """
+    Return the ETag of the current request, given the catalog version. Pages
+    show who is logged in, so the user (and admin) are part of it too.
+    """
+    key = "|".join((
+        current_app.extensions["http_cache"],
+        str(catalog.version()),
+        str(session.get("user_id")),
+        str(session.get("admin_id")),
+        request.full_path,
+    ))
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def conditional_on_catalog(f):
+    """
+    Decorate GET routes whose response only depends on the catalog (and the
+    request's URL): adds an ETag and answers a matching `If-None-Match` with
+    304 Not Modified without calling the route.
+    """
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        etag = catalog_etag()
+
+        # Pending flash messages are shown by the next rendered page, so render it
+        if etag in request.if_none_match and not session.get("_flashes"):
+            response = current_app.response_class(status=304)
+        else:
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        response.set_etag(etag)
+
+        # Browsers may keep the page, but must revalidate it (and never share it)
+        response.headers["Cache-Control"] = "private, no-cache"
+        response.vary.add("Cookie")
+        return response
+
+    return decorated_function
@@ -0,0 +1,256 @@
+# Background image pipeline for item images
+
+# Uploads are stored as-is, named after the SHA-256 of their content (the request
+# returns as soon as the original is on disk); a small pool of worker threads
+# then produces resized variants, e.g. static/images/variants/<hash>-card.webp.
+# Items whose variants are not ready (yet) are served the original image.
+# Files no item refers to anymore are removed by a sweeper, never inline.
+import assets
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from functools import lru_cache
+import catalog
+import db_utils
+import hashlib
+from helpers import run_periodically
+import os
+import re
+import tempfile
+import time
+
+# Pillow is optional: without it, items are served their original image
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+
+# Variants produced for every image: name -> bounding box (px)
+VARIANTS = {
+    "thumb": (160, 160),
+    "card": (480, 480),
+    "detail": (1200, 1200),
+}
+
+# Length of the (hex) content hash used in filenames
+HASH_LENGTH = 16
+
+# Files the sweeper may remove (if unused): content-addressed originals, their
+# variants and temporary files. Anything else in UPLOAD_FOLDER (e.g., 404.jpg or
+# images uploaded before content addressing) is never touched.
+ORIGINAL_PATTERN = re.compile(r"^[0-9a-f]{%d}\.\w+$" % HASH_LENGTH)
+VARIANT_PATTERN = re.compile(r"^([0-9a-f]{%d})-\w+\.\w+$" % HASH_LENGTH)
+TEMP_SUFFIX = ".tmp"
+
+
+@lru_cache(maxsize=None)
+def variant_format() -> tuple:
+    """Return the (Pillow format, extension) used for variants: WebP, or JPEG without WebP support."""
+    if features.check("webp"):
+        return "WEBP", ".webp"
+    return "JPEG", ".jpg"
+
+
+def variants_folder(app=None) -> str:
+    app = app or current_app
+    return os.path.join(app.config["UPLOAD_FOLDER"], "variants")
+
+
+def variant_name(image_hash: str, variant: str, extension: str) -> str:
+    return f"{image_hash}-{variant}{extension}"
+
+
+@lru_cache(maxsize=None)
+def static_path(upload_folder: str, static_folder: str) -> str:
+    """Return the path of UPLOAD_FOLDER relative to the static folder (e.g., "images")."""
+    return os.path.relpath(os.path.abspath(upload_folder), static_folder).replace(os.sep, "/")
+
+
+def save_original(file, extension: str) -> str:
+    """
+    Durably store an uploaded file (a werkzeug `FileStorage`) in UPLOAD_FOLDER
+    under a content-addressed name (`<hash><extension>`): written to a unique
+    temporary file, fsync'ed and then renamed into place. Concurrent uploads
+    never collide, and uploading the same image twice yields the same file.
+    Returns the new filename.
+    """
+    folder = current_app.config["UPLOAD_FOLDER"]
+    digest = hashlib.sha256()
+
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=TEMP_SUFFIX)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while chunk := file.stream.read(64 * 1024):
+                digest.update(chunk)
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+
+        filename = digest.hexdigest()[:HASH_LENGTH] + extension.lower()
+        os.replace(tmp_path, os.path.join(folder, filename))
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    return filename
+
+
+def save_variant(image, target: str, pil_format: str):
+    """
+    Save a resized image to `target` through a unique temporary file in the
+    same folder, renamed into place: jobs for items sharing an image (same
+    hash, same target) never write the same file. If saving fails but
+    another job has produced the target meanwhile, that one is used.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=TEMP_SUFFIX)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            image.save(f, pil_format, quality=82)
+        os.replace(tmp_path, target)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        if not os.path.exists(target):
+            raise
+
+
+def file_hash(path: str) -> str:
+    """Return the content hash of a file on disk."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(64 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def init_app(app):
+    """
+    Set up the worker pool and the variants folder of an application, and
+    start sweeping unused images every IMAGE_SWEEP_INTERVAL seconds (if > 0).
+    """
+    os.makedirs(variants_folder(app), exist_ok=True)
+
+    if Image is None:
+        app.logger.warning("Pillow is not installed, item images won't be resized")
+
+    app.extensions["images"] = ThreadPoolExecutor(
+        max_workers=app.config.get("IMAGE_WORKERS", 2),
+        thread_name_prefix="images",
+    )
+
+    interval = app.config.get("IMAGE_SWEEP_INTERVAL", 0)
+    if interval > 0:
+        run_periodically(app, interval, sweep, "images-sweeper", "Could not sweep unused images")
+
+
+def submit(item_id: int, filename: str):
+    """
+    Queue the production of variants for an item's image (a file in UPLOAD_FOLDER).
+    Returns a `Future`, or `None` if images can't be resized.
+    """
+    if Image is None:
+        return None
+    return current_app.extensions["images"].submit(
+        process, current_app._get_current_object(), item_id, filename)
+
+
+def request_sweep():
+    """Queue a sweep of unused images (e.g., after deleting an item). Returns a `Future`."""
+    return current_app.extensions["images"].submit(sweep, current_app._get_current_object())
+
+
+def sweep(app, grace: float = None) -> list:
+    """
+    Remove images no item refers to: originals, their variants and leftover
+    temporary files. Files younger than `grace` seconds (IMAGE_SWEEP_GRACE by
+    default) are kept, as they may belong to an upload that is still in
+    progress. Returns the paths of the removed files.
+    """
+    if grace is None:
+        grace = app.config.get("IMAGE_SWEEP_GRACE", 3600)
+
+    with app.app_context():
+        rows = db_utils.execute("SELECT filename, image_hash FROM items")
+        filenames = {row["filename"] for row in rows}
+        hashes = {row["image_hash"] for row in rows if row["image_hash"]}
+
+    cutoff = time.time() - grace
+    removed = []
+
+    def remove_if_old(path):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed.append(path)
+        except FileNotFoundError:
+            pass
+
+    folder = app.config["UPLOAD_FOLDER"]
+    for entry in os.scandir(folder):
+        if not entry.is_file():
+            continue
+        if entry.name.endswith(TEMP_SUFFIX) or (
+                ORIGINAL_PATTERN.match(entry.name) and entry.name not in filenames):
+            remove_if_old(entry.path)
+
+    for entry in os.scandir(variants_folder(app)):
+        match = VARIANT_PATTERN.match(entry.name)
+        if entry.name.endswith(TEMP_SUFFIX) or (match and match.group(1) not in hashes):
+            remove_if_old(entry.path)
+
+    if removed:
+        app.logger.info(f"Swept {len(removed)} unused image file(s)")
+    return removed
+
+
+def process(app, item_id: int, filename: str):
+    """
+    Produce every variant of an item's image and record its hash on the item
+    (runs on a worker thread).
+    """
+    with app.app_context():
+        try:
+            path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
+            image_hash = file_hash(path)
+            pil_format, extension = variant_format()
+
+            with Image.open(path) as original:
+                original.load()
+                if pil_format == "JPEG" and original.mode not in ("RGB", "L"):
+                    original = original.convert("RGB")
+
+                for variant, size in VARIANTS.items():
+                    target = os.path.join(variants_folder(app),
+                        variant_name(image_hash, variant, extension))
+
+                    # Content-addressed: an existing file is already the right one
+                    if os.path.exists(target):
+                        continue
+
+                    image = original.copy()
+                    image.thumbnail(size)
+                    save_variant(image, target, pil_format)
+
+            # Only if the item still has this image
+            db_utils.execute("UPDATE items SET image_hash = ? WHERE id = ? AND filename = ?",
+                (image_hash, item_id, filename))
+            catalog.invalidate()
+
+        except Exception:
+            app.logger.exception(f"Could not produce image variants of item {item_id}")
+            raise
+
+
+def image_url(item, variant: str = "card") -> str:
+    """
+    Return the URL of an item's image in a given variant (thumb, card or detail),
+    or of the original image if the variants are not available.
+    """
+    folder = static_path(current_app.config["UPLOAD_FOLDER"], current_app.static_folder)
+
+    if item["image_hash"] and Image is not None:
+        _, extension = variant_format()
+        return assets.asset_url(
+            f"{folder}/variants/{variant_name(item['image_hash'], variant, extension)}")
+    return assets.asset_url(f"{folder}/{item['filename']}")
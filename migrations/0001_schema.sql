@@ -0,0 +1,134 @@
+-- Baseline schema. Written to also bring databases created before versioned
+-- migrations up to date (every statement is idempotent); later changes ship
+-- as new numbered files in this folder (see db_utils.migrate).
+
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER NOT NULL,
+    username TEXT NOT NULL,
+    hash TEXT NOT NULL,
+
+    PRIMARY KEY (id)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS username ON users (username);
+
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    price_cents INTEGER NOT NULL DEFAULT 0,
+    description TEXT,
+    image_hash TEXT, -- Set once resized variants of the image exist (see images.py)
+    version INTEGER NOT NULL DEFAULT 0, -- Catalog version of its last change (see fragments.py)
+
+    PRIMARY KEY (id)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS title ON items (title);
+
+CREATE TABLE IF NOT EXISTS cart (
+    id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    item_id INTEGER NOT NULL,
+    quantity INTEGER NOT NULL DEFAULT 0,
+
+    FOREIGN KEY (user_id) REFERENCES users(id),
+    FOREIGN KEY (item_id) REFERENCES items(id),
+
+    PRIMARY KEY (id)
+);
+
+-- Merge duplicate rows of an item in a user's cart (older databases allowed
+-- them), so that there can be one row per (user_id, item_id)
+UPDATE cart SET quantity = (
+    SELECT SUM(quantity) FROM cart AS duplicate
+    WHERE duplicate.user_id = cart.user_id AND duplicate.item_id = cart.item_id
+)
+WHERE id IN (SELECT MIN(id) FROM cart GROUP BY user_id, item_id HAVING COUNT(*) > 1);
+DELETE FROM cart WHERE id NOT IN (SELECT MIN(id) FROM cart GROUP BY user_id, item_id);
+CREATE UNIQUE INDEX IF NOT EXISTS cart_user_item ON cart (user_id, item_id);
+
+-- An order (purchase) of a user, with its denormalized total
+CREATE TABLE IF NOT EXISTS order_headers (
+    id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    created_at INTEGER NOT NULL, -- Unix time (seconds)
+    status TEXT NOT NULL DEFAULT 'pending',
+    total_cents INTEGER NOT NULL DEFAULT 0,
+
+    FOREIGN KEY (user_id) REFERENCES users(id),
+
+    PRIMARY KEY (id)
+);
+CREATE INDEX IF NOT EXISTS order_headers_user_created ON order_headers (user_id, created_at);
+CREATE INDEX IF NOT EXISTS order_headers_status_created ON order_headers (status, created_at);
+
+-- The items of an order, with their title and unit price at the time of the order
+CREATE TABLE IF NOT EXISTS order_lines (
+    id INTEGER NOT NULL,
+    order_id INTEGER NOT NULL,
+    item_id INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    unit_price_cents INTEGER NOT NULL,
+
+    FOREIGN KEY (order_id) REFERENCES order_headers(id),
+    FOREIGN KEY (item_id) REFERENCES items(id),
+
+    PRIMARY KEY (id)
+);
+CREATE INDEX IF NOT EXISTS order_lines_order_id ON order_lines (order_id);
+
+-- Sessions of the "sqlite" session backend (see session_utils.py)
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT NOT NULL,
+    data TEXT NOT NULL, -- Tagged JSON
+    expires_at INTEGER NOT NULL, -- Unix time (seconds)
+
+    PRIMARY KEY (id)
+);
+CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at);
+
+CREATE TABLE IF NOT EXISTS admins (
+    id INTEGER NOT NULL,
+    username TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    
+    PRIMARY KEY (id)
+);
+
+-- Version stamp of the catalog (items), bumped by triggers on every change,
+-- so cached copies of the catalog (see catalog.py) can tell they are stale
+CREATE TABLE IF NOT EXISTS catalog_version (
+    id INTEGER NOT NULL CHECK (id = 1),
+    version INTEGER NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (id)
+);
+INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS catalog_version_insert AFTER INSERT ON items BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS catalog_version_update AFTER UPDATE ON items BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS catalog_version_delete AFTER DELETE ON items BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+
+-- Stamp an item with a fresh catalog version whenever a column shown on its
+-- card changes, so cached fragments of the item (see fragments.py) can tell
+-- they are stale. The stamp is never reused, even if an item id is.
+CREATE TRIGGER IF NOT EXISTS items_version_insert AFTER INSERT ON items BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+    UPDATE items SET version = (SELECT version FROM catalog_version WHERE id = 1)
+    WHERE id = new.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS items_version_update
+AFTER UPDATE OF title, filename, price_cents, description, image_hash ON items BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+    UPDATE items SET version = (SELECT version FROM catalog_version WHERE id = 1)
+    WHERE id = new.id;
+END;
@@ -0,0 +1,54 @@
+# Bring databases created before versioned migrations to the current columns:
+# add the new ones (with their backfill), move the old `orders` table to
+# order_headers/order_lines, then drop the columns they replaced.
+# (New databases already have the current tables; this does nothing there.)
+import db_utils
+import logging
+import os
+import sqlite3
+
+# Columns added to existing tables after their first release, as
+# (table, column, definition, backfill query or None)
+ADDED_COLUMNS = [
+    # First: the items_version_update trigger (0001_schema.sql) sets it on the backfills below
+    ("items", "version", "INTEGER NOT NULL DEFAULT 0", None),
+    ("items", "price_cents", "INTEGER NOT NULL DEFAULT 0",
+     "UPDATE items SET price_cents = CAST(ROUND(price * 100) AS INTEGER)"),
+    ("items", "image_hash", "TEXT", None),
+]
+
+# Columns replaced by an `ADDED_COLUMNS` entry, as (table, column); dropped
+# (after the orders migration, which still reads them) where SQLite supports it
+DROPPED_COLUMNS = [
+    ("items", "price"), # Replaced by price_cents
+]
+
+logger = logging.getLogger(__name__)
+
+
+def columns(db, table: str) -> list:
+    return [row[1] for row in db.execute(f"PRAGMA table_info({table})")]
+
+
+def upgrade(db):
+    for table, column, definition, backfill in ADDED_COLUMNS:
+        existing = columns(db, table)
+
+        # Skip tables that don't exist (anymore)
+        if existing and column not in existing:
+            db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            if backfill:
+                db.execute(backfill)
+
+    # Move orders from the old one-row-per-item table to order_headers/order_lines
+    if db_utils.table_exists(db, "orders"):
+        with open(os.path.join(os.path.dirname(__file__), "legacy_orders.sql")) as f:
+            db_utils.run_script(db, f.read())
+
+    for table, column in DROPPED_COLUMNS:
+        if column in columns(db, table):
+            try:
+                db.execute(f"ALTER TABLE {table} DROP COLUMN {column}")
+            except sqlite3.OperationalError as e:
+                # SQLite < 3.35 can't drop columns; the column is simply left unused
+                logger.warning(f"Could not drop {table}.{column}: {e}")
@@ -0,0 +1,16 @@
+# Full-text search index over items (items_fts.sql), if SQLite was built with
+# FTS5. Without it the index is skipped and search falls back to LIKE.
+import db_utils
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade(db):
+    if not db_utils.has_fts5(db):
+        logger.warning("SQLite has no FTS5, the search index is not created")
+        return
+
+    with open(os.path.join(os.path.dirname(__file__), "items_fts.sql")) as f:
+        db_utils.run_script(db, f.read())
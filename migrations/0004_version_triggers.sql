@@ -0,0 +1,32 @@
+-- Replace the catalog version triggers of 0001_schema.sql with one trigger
+-- per change of items, each bumping catalog_version exactly once. (With the
+-- old ones an edit fired both catalog_version_update and items_version_update,
+-- and the latter's stamp fired catalog_version_update again: every change
+-- invalidated the caches two or three times.)
+
+DROP TRIGGER IF EXISTS catalog_version_insert;
+DROP TRIGGER IF EXISTS catalog_version_update;
+DROP TRIGGER IF EXISTS catalog_version_delete;
+DROP TRIGGER IF EXISTS items_version_insert;
+DROP TRIGGER IF EXISTS items_version_update;
+
+-- Bump the catalog version, and stamp the item with it, so cached fragments
+-- of the item (see fragments.py) can tell they are stale. The stamp is never
+-- reused, even if an item id is.
+CREATE TRIGGER IF NOT EXISTS items_version_insert AFTER INSERT ON items BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+    UPDATE items SET version = (SELECT version FROM catalog_version WHERE id = 1)
+    WHERE id = new.id;
+END;
+
+-- The stamp itself changes `version`, so it doesn't fire this trigger again
+CREATE TRIGGER IF NOT EXISTS items_version_update AFTER UPDATE ON items
+WHEN new.version IS old.version BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+    UPDATE items SET version = (SELECT version FROM catalog_version WHERE id = 1)
+    WHERE id = new.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS catalog_version_delete AFTER DELETE ON items BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
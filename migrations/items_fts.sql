@@ -0,0 +1,38 @@
+-- Full-text search index over items (requires SQLite's FTS5 extension).
+-- Run by 0003_items_fts.py, only if FTS5 is available.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5 (
+    title,
+    description,
+
+    content = 'items',
+    content_rowid = 'id',
+    prefix = '2 3',
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+
+-- Rank matches in the title above matches in the description
+INSERT INTO items_fts (items_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)');
+
+-- Keep the index in sync with items
+CREATE TRIGGER IF NOT EXISTS items_fts_insert AFTER INSERT ON items BEGIN
+    INSERT INTO items_fts (rowid, title, description)
+    VALUES (new.id, new.title, new.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON items BEGIN
+    INSERT INTO items_fts (items_fts, rowid, title, description)
+    VALUES ('delete', old.id, old.title, old.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS items_fts_update AFTER UPDATE OF title, description ON items BEGIN
+    INSERT INTO items_fts (items_fts, rowid, title, description)
+    VALUES ('delete', old.id, old.title, old.description);
+    INSERT INTO items_fts (rowid, title, description)
+    VALUES (new.id, new.title, new.description);
+END;
+
+-- (Re)build the index for rows that existed before it did
+INSERT INTO items_fts (items_fts)
+SELECT 'rebuild'
+WHERE (SELECT COUNT(*) FROM items_fts_docsize) != (SELECT COUNT(*) FROM items);
@@ -0,0 +1,29 @@
+-- One-off migration of the old `orders` table (one row per item, with a date
+-- string) to order_headers/order_lines. Run by 0002_legacy_columns.py (in its
+-- transaction) if an `orders` table still exists.
+
+-- Rows of a user placed at the same time (and still sharing a status) form one order
+INSERT INTO order_headers (user_id, created_at, status, total_cents)
+SELECT orders.user_id,
+       CAST(strftime('%s', orders.date, 'utc') AS INTEGER),
+       orders.status,
+       SUM(COALESCE(items.price_cents, 0) * orders.quantity)
+FROM orders LEFT JOIN items ON items.id = orders.item_id
+GROUP BY orders.user_id, orders.date, orders.status
+ORDER BY MIN(orders.id);
+
+INSERT INTO order_lines (order_id, item_id, title, quantity, unit_price_cents)
+SELECT order_headers.id,
+       orders.item_id,
+       COALESCE(items.title, ''),
+       orders.quantity,
+       COALESCE(items.price_cents, 0)
+FROM orders
+JOIN order_headers
+    ON order_headers.user_id = orders.user_id
+    AND order_headers.created_at = CAST(strftime('%s', orders.date, 'utc') AS INTEGER)
+    AND order_headers.status = orders.status
+LEFT JOIN items ON items.id = orders.item_id
+ORDER BY orders.id;
+
+DROP TABLE orders;
@@ -0,0 +1,84 @@
+# Order queries (order_headers/order_lines)
+
+import db_utils
+import time
+
+
+def place(user_id: int):
+    """
+    Turn a user's cart into an order and empty the cart, in one transaction.
+    Titles and unit prices are copied into the order lines, and the total
+    into the order header. Returns the new order's id, or `None` if the cart
+    was empty.
+    """
+    with db_utils.transaction():
+        rows = db_utils.execute("""
+            SELECT COUNT(*) AS n,
+                   COALESCE(SUM(items.price_cents * cart.quantity), 0) AS total_cents
+            FROM cart JOIN items ON items.id = cart.item_id
+            WHERE cart.user_id = ?""",
+            (user_id,))
+
+        if rows[0]["n"] == 0:
+            return None
+
+        order_id = db_utils.execute("""
+            INSERT INTO order_headers (user_id, created_at, total_cents)
+            VALUES (?, ?, ?)""",
+            (user_id, int(time.time()), rows[0]["total_cents"]))
+
+        db_utils.execute("""
+            INSERT INTO order_lines (order_id, item_id, title, quantity, unit_price_cents)
+            SELECT ?, items.id, items.title, cart.quantity, items.price_cents
+            FROM cart JOIN items ON items.id = cart.item_id
+            WHERE cart.user_id = ?""",
+            (order_id, user_id))
+
+        db_utils.execute("DELETE FROM cart WHERE user_id = ?", (user_id,))
+
+    return order_id
+
+
+def get_user_orders(user_id: int, after: int = None, limit: int = 50) -> list:
+    """
+    Return a page of a user's orders (headers), newest first: one range scan of
+    order_headers_user_created. `after` is the id of the last order of the
+    previous page.
+    """
+    if after is None:
+        return db_utils.execute("""
+            SELECT * FROM order_headers
+            WHERE user_id = ?
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?""",
+            (user_id, limit))
+
+    return db_utils.execute("""
+        SELECT * FROM order_headers
+        WHERE user_id = ?
+        AND (created_at, id) < ((SELECT created_at FROM order_headers WHERE id = ?), ?)
+        ORDER BY created_at DESC, id DESC
+        LIMIT ?""",
+        (user_id, after, after, limit))
+
+
+def get_lines(order_ids) -> dict:
+    """
+    Return the lines of the given orders, as a `dict` of order id -> `list` of lines.
+    """
+    lines = {id: [] for id in order_ids}
+    if not lines:
+        return lines
+
+    placeholders = ", ".join("?" * len(lines))
+    for line in db_utils.execute(
+            f"SELECT * FROM order_lines WHERE order_id IN ({placeholders}) ORDER BY id",
+            tuple(lines)):
+        lines[line["order_id"]].append(line)
+    return lines
+
+
+def set_status(order_id: int, status: str) -> int:
+    """Set the status of an order. Returns the number of updated rows."""
+    return db_utils.execute("UPDATE order_headers SET status = ? WHERE id = ?",
+        (status, order_id))
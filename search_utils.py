@@ -0,0 +1,83 @@
+# Item search queries, shared by the JSON and the HTML search endpoints
+
+# Results are cached per worker for a short while (SEARCH_CACHE_TTL), keyed by
+# the normalized query and the catalog version: live search sends the same
+# popular prefixes over and over, and those are then served without SQLite.
+from cache_utils import LRUCache
+from flask import current_app
+from helpers import fts_query
+import catalog
+import db_utils
+
+
+def get_cache(app=None) -> LRUCache:
+    """Return the search result cache of an application, creating it on first use."""
+    app = app or current_app._get_current_object()
+    cache = app.extensions.get("search")
+    if cache is None:
+        cache = app.extensions.setdefault("search", LRUCache(
+            app.config.get("SEARCH_CACHE_SIZE", 512),
+            app.config.get("SEARCH_CACHE_TTL", 60.0),
+        ))
+    return cache
+
+
+def normalize(q: str) -> str:
+    """
+    Return the canonical form of a search query: the FTS5 MATCH expression
+    (so "Apple  pie!" and "apple pie" are the same query), or the query as-is
+    for the LIKE fallback.
+    """
+    if current_app.config["FTS5_ENABLED"]:
+        return fts_query(q)
+    return q
+
+
+def search(q: str, after: int = None, limit: int = 15) -> tuple:
+    """
+    Return a page of the items (`dict`) matching a search query, best matches
+    first, from the result cache if possible. `after` is the id of the last
+    item of the previous page. (The items are shared: don't change them.)
+    """
+    query = normalize(q) if q else ""
+    if not query:
+        return ()
+
+    # A changed catalog makes every cached result stale
+    key = (query, after, limit, catalog.version())
+    cache = get_cache()
+
+    items = cache.get(key)
+    if items is None:
+        items = tuple(query_items(query, after, limit))
+        cache.put(key, items)
+    return items
+
+
+def query_items(query: str, after: int = None, limit: int = 15) -> list:
+    """Run a (normalized) search query against the database."""
+
+    if not current_app.config["FTS5_ENABLED"]:
+        # Fallback if SQLite was built without FTS5
+        return db_utils.execute(
+            "SELECT * FROM items WHERE title LIKE ? AND id > ? ORDER BY id LIMIT ?",
+            ("%" + query + "%", after or 0, limit))
+
+    # Prefix match on every word, best (bm25) matches first; `after` is the id
+    # of the last item of the previous page, so the page is a (rank, id) keyset
+    if after is None:
+        return db_utils.execute("""
+            SELECT items.* FROM items_fts
+            JOIN items ON items.id = items_fts.rowid
+            WHERE items_fts MATCH ?
+            ORDER BY items_fts.rank, items.id
+            LIMIT ?""", (query, limit))
+
+    return db_utils.execute("""
+        SELECT items.* FROM items_fts
+        JOIN items ON items.id = items_fts.rowid
+        WHERE items_fts MATCH ?
+        AND (items_fts.rank, items.id) >
+            ((SELECT rank FROM items_fts WHERE items_fts MATCH ? AND rowid = ?), ?)
+        ORDER BY items_fts.rank, items.id
+        LIMIT ?""", (query, query, after, after, limit))
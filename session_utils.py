@@ -0,0 +1,122 @@
+# Session backends
+
+# SESSION_BACKEND selects where sessions are stored:
+# - "filesystem": one file per session in flask_session/ (Flask-Session)
+# - "sqlite": the `sessions` table of the app's database (see migrations/), with
+#   expired rows removed by a background sweeper; works with several workers
+# - "cookie": Flask's signed cookie (needs SECRET_KEY); sessions only hold
+#   user_id/admin_id and flashed messages, so they fit in a cookie easily
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSessionInterface, SessionInterface, SessionMixin
+from flask_session import Session
+from werkzeug.datastructures import CallbackDict
+from helpers import run_periodically
+import db_utils
+import secrets
+import time
+
+BACKENDS = ("filesystem", "sqlite", "cookie")
+
+
+class SQLiteSession(CallbackDict, SessionMixin):
+    """A session stored in the `sessions` table, under a random id (`sid`)."""
+
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+
+class SQLiteSessionInterface(SessionInterface):
+    """
+    Store sessions in the `sessions` table; the cookie only holds the session id.
+    A row is only written when its session changed.
+    """
+
+    serializer = TaggedJSONSerializer()
+    session_class = SQLiteSession
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+
+        if sid:
+            rows = db_utils.execute(
+                "SELECT data FROM sessions WHERE id = ? AND expires_at > ?",
+                (sid, int(time.time())), row_type=db_utils.ROW_TUPLE)
+            if rows:
+                try:
+                    return self.session_class(self.serializer.loads(rows[0][0]), sid=sid)
+                except ValueError:
+                    pass
+
+        # Never adopt an id the client made up: unknown ids get a new session
+        return self.session_class(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        # The session was emptied (e.g., logout): delete it
+        if not session:
+            if session.modified:
+                db_utils.execute("DELETE FROM sessions WHERE id = ?", (session.sid,))
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                    samesite=samesite, httponly=httponly)
+                response.vary.add("Cookie")
+            return
+
+        if not self.should_set_cookie(app, session):
+            return
+
+        expires_at = int(time.time() + app.permanent_session_lifetime.total_seconds())
+        db_utils.execute("""
+            INSERT INTO sessions (id, data, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at""",
+            (session.sid, self.serializer.dumps(dict(session)), expires_at))
+
+        response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session),
+            httponly=httponly, domain=domain, path=path, secure=secure, samesite=samesite)
+        response.vary.add("Cookie")
+
+
+def sweep(app) -> int:
+    """Delete expired sessions from the `sessions` table. Returns how many."""
+    with app.app_context():
+        return db_utils.execute("DELETE FROM sessions WHERE expires_at <= ?",
+            (int(time.time()),))
+
+
+def init_app(app, backend: str = None):
+    """
+    Set up the session backend of an application (SESSION_BACKEND by default).
+    The "sqlite" backend sweeps expired sessions every SESSION_SWEEP_INTERVAL
+    seconds (if > 0). (Call after db_utils.init_db.)
+    """
+    backend = backend or app.config.get("SESSION_BACKEND", "filesystem")
+
+    if backend == "filesystem":
+        Session(app)
+
+    elif backend == "cookie":
+        if not app.secret_key:
+            raise RuntimeError('SESSION_BACKEND "cookie" needs a SECRET_KEY')
+        app.session_interface = SecureCookieSessionInterface()
+
+    elif backend == "sqlite":
+        app.session_interface = SQLiteSessionInterface()
+
+        interval = app.config.get("SESSION_SWEEP_INTERVAL", 0)
+        if interval > 0:
+            run_periodically(app, interval, sweep, "sessions-sweeper",
+                "Could not sweep expired sessions")
+
+    else:
+        raise ValueError(f"Unknown SESSION_BACKEND {backend!r}, expected one of {BACKENDS}")
@@ -0,0 +1,62 @@
+document.addEventListener('DOMContentLoaded', () => {
+    const cart = document.querySelector('div#cart');
+
+    const formatter = new Intl.NumberFormat('en-US', {
+        style: 'currency',
+        currency: 'USD'
+    });
+
+    // Update and delete forms call the JSON cart API instead of reloading the cart
+    // (without JavaScript, the forms still post to /update-qty and /delete)
+    cart.addEventListener('submit', async (event) => {
+        const form = event.target;
+        const action = form.dataset.cartAction;
+
+        if (!action) {
+            return;
+        }
+
+        event.preventDefault();
+
+        const id = form.querySelector('input[name="id"]').value;
+        const body = {id: id};
+        if (action === 'update') {
+            body.qty = form.querySelector('input[name="qty"]').value;
+        }
+
+        let data;
+        try {
+            const response = await fetch(cart.dataset.api, {
+                method: action === 'update' ? 'PATCH' : 'DELETE',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify(body)
+            });
+
+            if (!response.ok) {
+                throw new Error(response.statusText);
+            }
+
+            data = await response.json();
+        } catch (error) {
+            // Fall back to a regular form submission
+            form.submit();
+            return;
+        }
+
+        const line = cart.querySelector(`[data-cart-line="${data.id}"]`);
+
+        if (data.line) {
+            line.querySelector('[data-qty-label]').textContent = 'Quantity: ' + data.line.quantity;
+        } else {
+            line.remove();
+        }
+
+        if (!cart.querySelector('[data-cart-line]')) {
+            // The cart is empty now, show the empty cart page
+            window.location.reload();
+            return;
+        }
+
+        document.querySelector('span#cartTotal').textContent = formatter.format(data.total_cents / 100);
+    });
+});
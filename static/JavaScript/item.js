@@ -9,4 +9,41 @@ document.addEventListener('DOMContentLoaded', () => {
         
     });
 
+    // "Add to cart" goes through the JSON cart API and stays on the page
+    // ("Buy now" still submits the form and goes to the cart)
+    const form = document.querySelector('form#addToCart');
+
+    form.addEventListener('submit', async (event) => {
+
+        if (!event.submitter || !event.submitter.hasAttribute('data-api-submit')) {
+            return;
+        }
+
+        event.preventDefault();
+
+        const status = document.querySelector('p#addToCartStatus');
+
+        try {
+            const response = await fetch(form.dataset.api, {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({
+                    id: form.querySelector('input[name="id"]').value,
+                    qty: form.querySelector('input[name="qty"]').value
+                })
+            });
+
+            if (!response.ok) {
+                throw new Error(response.statusText);
+            }
+
+            const data = await response.json();
+            status.textContent = 'Added to cart (' + data.line.quantity + ' in cart).';
+        } catch (error) {
+            // Fall back to a regular form submission
+            form.submit();
+        }
+
+    });
+
 });
@@ -1,42 +1,69 @@
 document.addEventListener('DOMContentLoaded', () => {
-    const originalContent = document.querySelector('div.row').innerHTML;
-    
-    const formatter = new Intl.NumberFormat('en-US', {
-        style: 'currency',
-        currency: 'USD'
-    });
+    const results = document.querySelector('div.row');
+    const originalContent = results.innerHTML;
+
+    // Wait for a pause in typing before searching
+    const DEBOUNCE_MS = 250;
 
-    document.querySelector('input[type="search"]').addEventListener('input', async (event) => {
-        const response = await fetch("/api/search?q=" + event.target.value);
-        const items = await response.json();
-        let html = ``;
+    // Rendered results of this browser tab, by catalog version and query (see /search in app.py)
+    const CACHE_KEY = 'search:' + results.dataset.catalogVersion + ':';
 
-        for (const item of items) {
-            html +=
-                `
-                <div class="col">
+    let timer = null;
+    let controller = null;
 
-                    <div class="card h-100">
+    async function search(q) {
+        const cached = sessionStorage.getItem(CACHE_KEY + q);
+        if (cached !== null) {
+            return cached;
+        }
 
-                        <img alt="${item.title}" class="card-img-top" src="/static/images/${item.filename}">
+        // Cancel the previous request, so an older response can't overwrite newer results
+        if (controller) {
+            controller.abort();
+        }
+        controller = new AbortController();
 
-                        <div class="card-body">
-                            <h5 class="card-title">${item.title}</h5>
-                            <p class="card-text">${item.description}</p>
-                            <p class="card-text">Price: ${formatter.format(item.price)}</p>
-                            <a class="stretched-link" href="/item/${item.id}"></a>
-                        </div>
+        const response = await fetch('/search?q=' + encodeURIComponent(q), { signal: controller.signal });
 
-                    </div>
+        // An error page or a redirect (e.g., to the login page) is no result: not shown, not cached
+        if (!response.ok || response.redirected) {
+            return null;
+        }
+        const html = await response.text();
 
-                </div>
-                `;
+        try {
+            sessionStorage.setItem(CACHE_KEY + q, html);
+        } catch (error) {
+            // Storage full: just don't cache
         }
+        return html;
+    }
+
+    document.querySelector('input[type="search"]').addEventListener('input', (event) => {
+        const q = event.target.value.trim();
+        clearTimeout(timer);
 
-        if (event.target.value) {
-            document.querySelector('div.row').innerHTML = html;
-        } else {
-            document.querySelector('div.row').innerHTML = originalContent;
+        if (!q) {
+            if (controller) {
+                controller.abort();
+            }
+            results.innerHTML = originalContent;
+            return;
         }
+
+        timer = setTimeout(async () => {
+            try {
+                const html = await search(q);
+
+                // Only show results of what is in the search box now
+                if (event.target.value.trim() === q) {
+                    results.innerHTML = html === null ? originalContent : html;
+                }
+            } catch (error) {
+                if (error.name !== 'AbortError') {
+                    throw error;
+                }
+            }
+        }, DEBOUNCE_MS);
     });
-});
\ No newline at end of file
+});
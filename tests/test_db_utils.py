@@ -0,0 +1,59 @@
+# Connection pools of db_utils under concurrent requests
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask
+import db_utils
+import pytest
+import sqlite3
+import threading
+
+REQUESTS = 6
+
+
+def make_app(database: str, split: bool) -> Flask:
+    """A bare app with a pool smaller than the number of concurrent requests."""
+    db = sqlite3.connect(database)
+    db.execute("PRAGMA journal_mode = WAL")
+    db.execute("CREATE TABLE counters (id INTEGER PRIMARY KEY, n INTEGER NOT NULL)")
+    db.execute("INSERT INTO counters (id, n) VALUES (1, 0)")
+    db.commit()
+    db.close()
+
+    app = Flask(__name__)
+    app.config["DATABASE"] = database
+    app.config["DB_READ_ONLY_CONNECTIONS"] = split
+    app.config["DB_POOL_SIZE"] = 2
+    app.config["DB_WRITER_POOL_SIZE"] = 2
+    app.config["DB_POOL_TIMEOUT"] = 3.0
+    app.teardown_appcontext(db_utils.release_db)
+
+    # As many requests as the pool has connections are inside the view at
+    # the same time, each holding its reader when it starts writing
+    barrier = threading.Barrier(app.config["DB_POOL_SIZE"], timeout=5)
+
+    @app.route("/write", methods=["POST"])
+    def write():
+        db_utils.execute("SELECT n FROM counters WHERE id = 1")
+        barrier.wait()
+        db_utils.execute("UPDATE counters SET n = n + 1 WHERE id = 1")
+        with db_utils.transaction():
+            db_utils.execute("UPDATE counters SET n = n + 1 WHERE id = 1")
+        return ""
+
+    return app
+
+
+@pytest.mark.parametrize("split", [False, True], ids=["shared-pool", "read-write-split"])
+def test_concurrent_writes(tmp_path, split):
+    app = make_app(str(tmp_path / "test.db"), split)
+
+    # Threads get a client each; they only share the app and its pools
+    def post(_):
+        return app.test_client().post("/write").status_code
+
+    with ThreadPoolExecutor(REQUESTS) as executor:
+        statuses = list(executor.map(post, range(REQUESTS)))
+
+    assert statuses == [200] * REQUESTS
+    with app.app_context():
+        assert db_utils.execute("SELECT n FROM counters WHERE id = 1")[0]["n"] == 2 * REQUESTS
+    db_utils.close_pools(app)